@@ -0,0 +1,184 @@
+"""Measures the throughput and peak memory of the parser on a synthetic takeout.
+
+Run from the repository root, e.g.:
+    python benchmarks/run_benchmarks.py --scale 2 --backend fast --json results.json
+
+Each benchmark is timed once without memory tracing, and then run again under tracemalloc
+to measure its peak memory, since tracing slows Python down considerably. It is also run once
+in a fresh process to measure the peak resident set size (RSS), which includes memory that
+tracemalloc doesn't see, such as the interpreter and C extensions.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import os.path
+import sys
+import tempfile
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, where peak RSS isn't reported
+    resource = None
+
+import google_voice_takeout_parser
+from synthetic_takeout import SyntheticTakeout, generate_takeout
+
+
+def bench_parse_file(indir, options):
+    record_count = 0
+    file_count = 0
+    for f in os.listdir(indir):
+        if f.endswith('.html'):
+            record_count += len(google_voice_takeout_parser.parse_file(os.path.join(indir, f), options.backend))
+            file_count += 1
+    return file_count, record_count
+
+
+def bench_process_directory(indir, options):
+    file_count, csv_entries = google_voice_takeout_parser.process_directory(indir, workers=options.workers,
+                                                                            backend=options.backend)
+    return file_count, len(csv_entries)
+
+
+def bench_group_thread(indir, options):
+    # A single very long group conversation, which should take time linear in its size
+    records = google_voice_takeout_parser.parse_file(options.group_thread_fpath, options.backend)
+    return 1, len(records)
+
+
+def bench_group_thread_streaming(indir, options):
+    # The same conversation, parsed incrementally so that memory stays flat
+    record_count = sum(1 for _ in google_voice_takeout_parser.iter_text_file(options.group_thread_fpath))
+    return 1, record_count
+
+
+def bench_write_to_csv(indir, options):
+    # The records are parsed beforehand, so that only the writing is measured
+    with tempfile.TemporaryDirectory() as outdir:
+        record_count = google_voice_takeout_parser.write_to_csv(os.path.join(outdir, 'out.csv'), options.records)
+    return None, record_count
+
+
+BENCHMARKS = {
+    'parse_file': bench_parse_file,
+    'process_directory': bench_process_directory,
+    'group_thread': bench_group_thread,
+    'group_thread_streaming': bench_group_thread_streaming,
+    'write_to_csv': bench_write_to_csv,
+}
+
+
+def _peak_rss():
+    # On Linux, ru_maxrss survives exec, so a new process would report the peak of the process which
+    # started it. VmHWM is the peak of the current process only.
+    try:
+        with open('/proc/self/status', encoding='ascii') as fh:
+            for line in fh:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    # ru_maxrss is in bytes on macOS, and in KiB elsewhere
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak_rss if sys.platform == 'darwin' else peak_rss * 1024
+
+
+def _peak_rss_child(name, indir, options, queue):
+    BENCHMARKS[name](indir, options)
+    queue.put(_peak_rss())
+
+
+def measure_peak_rss(name, indir, options):
+    """Runs a benchmark in a new process, returning the peak RSS of that process in bytes"""
+    child_options = argparse.Namespace(**vars(options))
+    if name != 'write_to_csv':
+        # Only write_to_csv needs the parsed records, which would otherwise inflate the RSS
+        child_options.records = None
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=_peak_rss_child, args=(name, indir, child_options, queue))
+    process.start()
+    peak_rss = queue.get()
+    process.join()
+    return peak_rss
+
+
+def run_benchmark(name, indir, options):
+    func = BENCHMARKS[name]
+    start = time.perf_counter()
+    file_count, record_count = func(indir, options)
+    elapsed = time.perf_counter() - start
+    result = {
+        'benchmark': name,
+        'seconds': elapsed,
+        'files': file_count,
+        'records': record_count,
+        'files_per_second': file_count / elapsed if file_count else None,
+        'records_per_second': record_count / elapsed if record_count else None,
+        'peak_memory_bytes': None,
+        'peak_rss_bytes': None,
+    }
+    if options.memory:
+        tracemalloc.start()
+        func(indir, options)
+        result['peak_memory_bytes'] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        if resource is not None:
+            result['peak_rss_bytes'] = measure_peak_rss(name, indir, options)
+    return result
+
+
+def print_results(results):
+    print(f"{'benchmark':<22} {'seconds':>9} {'files/sec':>11} {'records/sec':>12} {'peak MiB':>9} {'RSS MiB':>8}")
+    for result in results:
+        files_per_second = f"{result['files_per_second']:.0f}" if result['files_per_second'] else '-'
+        records_per_second = f"{result['records_per_second']:.0f}" if result['records_per_second'] else '-'
+        peak_memory = f"{result['peak_memory_bytes'] / 2**20:.1f}" if result['peak_memory_bytes'] else '-'
+        peak_rss = f"{result['peak_rss_bytes'] / 2**20:.1f}" if result['peak_rss_bytes'] else '-'
+        print(f"{result['benchmark']:<22} {result['seconds']:>9.3f} {files_per_second:>11} "
+              f"{records_per_second:>12} {peak_memory:>9} {peak_rss:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks the Google Voice Takeout parser')
+    parser.add_argument('--indir', help="Benchmark an existing takeout folder instead of generating one")
+    parser.add_argument('--scale', type=float, default=1.0, help="The size of the generated takeout (default: 1)")
+    parser.add_argument('--backend', choices=sorted(google_voice_takeout_parser.PARSER_BACKENDS), default='html5lib')
+    parser.add_argument('-j', '--workers', type=int, default=1, help="Workers for process_directory (default: 1)")
+    parser.add_argument('--no-memory', dest='memory', action='store_false',
+                        help="Skip measuring peak memory and peak RSS")
+    parser.add_argument('--only', action='append', choices=sorted(BENCHMARKS), help="Only run these benchmarks")
+    parser.add_argument('--group-messages', type=int, default=None,
+                        help="The number of messages in the group_thread benchmark (default: 10000 x scale)")
+    parser.add_argument('--json', help="Also write the results to this JSON file")
+    options = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        indir = options.indir
+        if indir is None:
+            indir = os.path.join(tmpdir, 'takeout')
+            scale = options.scale
+            file_count, record_count = generate_takeout(
+                indir, calls=int(1000 * scale), voicemails=int(200 * scale), conversations=int(500 * scale),
+                group_conversations=max(1, int(10 * scale)), messages_per_group=int(2000 * scale))
+            print(f"Generated {file_count} files with {record_count} records")
+
+        group_takeout = SyntheticTakeout(os.path.join(tmpdir, 'group_thread'), media=False)
+        group_takeout.conversation(options.group_messages or int(10000 * options.scale), participant_count=20)
+        options.group_thread_fpath = os.path.join(group_takeout.outdir, os.listdir(group_takeout.outdir)[0])
+
+        _, options.records = google_voice_takeout_parser.process_directory(indir, backend=options.backend)
+        results = [run_benchmark(name, indir, options) for name in options.only or BENCHMARKS]
+
+    print_results(results)
+    if options.json:
+        with open(options.json, 'w', encoding='utf-8') as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""Generates synthetic Google Voice Takeout folders of any size, for benchmarking.
+
+The <head> of each file is copied from the matching file in tests/test_data, and the body follows
+the same markup, so the output exercises the same code paths as a real export.
+"""
+import argparse
+import datetime
+import os
+import os.path
+import random
+import re
+
+TEST_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tests', 'test_data')
+
+FIRST_NAMES = ['Joe', 'Bob', 'Anonymous', 'Alice', 'Carol', 'Dave', 'Erin', 'Frank', 'Grace', 'Heidi']
+LAST_NAMES = ['Smith', 'Jones', 'Brown', 'Miller', 'Davis', 'Garcia', 'Wilson', 'Moore']
+WORDS = ['hello', 'goodbye', 'see', 'you', 'soon', 'call', 'me', 'later', 'thanks', 'running', 'late',
+         'lunch', 'tomorrow', 'sounds', 'good', 'ok', 'where', 'are', 'what', 'time']
+
+TAGS = {
+    'sms': '<a rel="tag" href="http://www.google.com/voice#sms">Text</a>',
+    'inbox': '<a rel="tag" href="http://www.google.com/voice#inbox">Inbox</a>',
+    'received': '<a rel="tag" href="http://www.google.com/voice#received">Received</a>',
+    'placed': '<a rel="tag" href="http://www.google.com/voice#placed">Placed</a>',
+    'missed': '<a rel="tag" href="http://www.google.com/voice#missed">Missed</a>',
+    'voicemail': '<a rel="tag" href="http://www.google.com/voice#voicemail">Voicemail</a>',
+}
+
+FOOTER = '''<div class="tags">Labels:
+{tags}</div>
+<div class="deletedStatusContainer">User Deleted:
+False</div>'''
+
+CALL_BODY = '''<body><div class="haudio"><span class="album">Call Log for
+</span>
+<span class="fn">{title}</span>
+<div class="contributor vcard">{label}
+<a class="tel" href="tel:{number}"><span class="fn">{name}</span></a></div>
+<abbr class="published" title="{timestamp}">{display_time}</abbr>
+{details}
+''' + FOOTER + '''</div></body></html>'''
+
+DURATION = '''
+<br />
+<abbr class="duration" title="PT{seconds}S">({duration})</abbr>
+'''
+
+VOICEMAIL_DETAILS = '''Transcript:
+<span class="description"><span class="full-text">{transcript}</span>
+</span>
+
+<br />
+<audio controls="controls" src="{audio}"><a rel="enclosure" href="{audio}">Audio</a></audio>
+
+'''
+
+TEXT_BODY = '''<body><div class="hChatLog hfeed">{participants}
+{messages}</div>
+
+''' + FOOTER + '''</body></html>'''
+
+PARTICIPANTS = '''<div class="participants">Group conversation with:
+{cites}</div>'''
+
+CITE = '''<cite class="sender vcard"><a class="tel" href="tel:{number}"><span class="fn">{name}</span></a></cite>'''
+
+OUTGOING_CITE = '''<cite class="sender vcard"><a class="tel" href="tel:{number}"><abbr class="fn" title="">Me</abbr></a></cite>'''
+
+MESSAGE = '''<div class="message"><abbr class="dt" title="{timestamp}">{display_time}</abbr>:
+{cite}:
+<q>{text}</q>
+{attachments}</div>'''
+
+IMAGE = '''<div><img src="{media}" alt="Image MMS Attachment" /></div>'''
+
+VIDEO = '''<div><a class="video" href="{media}">Video attachment</a></div>'''
+
+CONTACT = '''<div><a class="vcard" href="{media}">Contact card attachment</a></div>'''
+
+# The extension each kind of attachment is written with
+MEDIA_EXTENSIONS = {IMAGE: '.jpg', VIDEO: '.3gp', CONTACT: '.vcf'}
+
+
+def _read_head(fixture):
+    """Returns the fixture's markup up to <body>, with a placeholder for the title"""
+    with open(os.path.join(TEST_DATA_DIR, fixture), encoding='utf-8') as fh:
+        data = fh.read()
+    # Escape the braces in the stylesheet, since the head is used with str.format
+    head = data[:data.index('<body>')].replace('{', '{{').replace('}', '}}')
+    return re.sub('<title>.*?</title>', lambda match: '<title>{title}</title>', head, flags=re.DOTALL)
+
+
+class SyntheticTakeout:
+    """Writes synthetic Takeout files into outdir. Use a fixed seed for reproducible output."""
+
+    def __init__(self, outdir, seed=0, media=True):
+        self.outdir = outdir
+        self.random = random.Random(seed)
+        self.media = media
+        self.call_head = _read_head('Call - Voicemail.html')
+        self.text_head = _read_head('Text - Group text names.html')
+        self.start = datetime.datetime(2019, 1, 1, tzinfo=datetime.timezone(datetime.timedelta(hours=-5)))
+        self.file_count = 0
+        self.record_count = 0
+        os.makedirs(outdir, exist_ok=True)
+
+    def contact(self):
+        name = f"{self.random.choice(FIRST_NAMES)} {self.random.choice(LAST_NAMES)}"
+        number = f"+1{self.random.randint(200, 999)}555{self.random.randint(0, 9999):04d}"
+        return name, number
+
+    def timestamp(self):
+        return self.start + datetime.timedelta(seconds=self.random.randint(0, 5 * 365 * 24 * 3600),
+                                               milliseconds=self.random.randint(0, 999))
+
+    def sentence(self, max_words=12):
+        return ' '.join(self.random.choice(WORDS) for _ in range(self.random.randint(1, max_words)))
+
+    @staticmethod
+    def format_timestamp(timestamp):
+        # Sample value: '2022-09-30T14:36:36.127-04:00'
+        text = timestamp.isoformat(timespec='milliseconds')
+        display_time = timestamp.strftime('%b %d, %Y, %I:%M:%S&#8239;%p\nEastern Time')
+        return text, display_time
+
+    @staticmethod
+    def file_timestamp(timestamp):
+        return timestamp.astimezone(datetime.timezone.utc).strftime('%Y-%m-%dT%H_%M_%SZ')
+
+    def write(self, fname, data, records):
+        with open(os.path.join(self.outdir, fname), 'w', encoding='utf-8') as fh:
+            fh.write(data)
+        self.file_count += 1
+        self.record_count += records
+
+    def write_media(self, media, extension):
+        if self.media:
+            with open(os.path.join(self.outdir, media + extension), 'wb') as fh:
+                fh.write(b'\0' * 64)
+
+    def call(self, kind):
+        """Writes one call. kind is 'Received', 'Placed', 'Missed' or 'Voicemail'"""
+        labels = {
+            'Received': ('Received call from', 'received'),
+            'Placed': ('Placed call to', 'placed'),
+            'Missed': ('Missed call from', 'missed,inbox'),
+            'Voicemail': ('Voicemail from', 'voicemail,inbox'),
+        }
+        label, tags = labels[kind]
+        name, number = self.contact()
+        if self.random.random() < 0.3:
+            name = ''
+        timestamp = self.timestamp()
+        timestamp_text, display_time = self.format_timestamp(timestamp)
+        fname_base = f"{name or number} - {kind} - {self.file_timestamp(timestamp)}"
+
+        details = ''
+        if kind != 'Missed':
+            seconds = self.random.randint(1, 3600)
+            duration = f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+            details = DURATION.format(seconds=seconds, duration=duration)
+        if kind == 'Voicemail':
+            audio = fname_base + '.mp3'
+            details = VOICEMAIL_DETAILS.format(transcript=self.sentence(40), audio=audio) + details
+            self.write_media(fname_base, '.mp3')
+
+        title = f"{label}\n{name}"
+        data = self.call_head.format(title=title) + CALL_BODY.format(
+            title=title, label=label, number=number, name=name, timestamp=timestamp_text,
+            display_time=display_time, details=details,
+            tags=', '.join(TAGS[tag] for tag in tags.split(',')))
+        self.write(fname_base + '.html', data, 1)
+
+    def conversation(self, message_count, participant_count=1, media_rate=0.0):
+        """Writes one text conversation. With more than one participant, it is a group conversation"""
+        participants = [self.contact() for _ in range(participant_count)]
+        own_number = f"+1555555{self.random.randint(0, 9999):04d}"
+        timestamp = self.timestamp()
+        is_group = participant_count > 1
+        if is_group:
+            title = 'Group Conversation'
+            fname_base = f"Group Conversation - {self.file_timestamp(timestamp)}"
+            participants_markup = PARTICIPANTS.format(cites=', '.join(CITE.format(name=name, number=number)
+                                                                     for name, number in participants))
+        else:
+            title = participants[0][0]
+            fname_base = f"{participants[0][0]} - Text - {self.file_timestamp(timestamp)}"
+            participants_markup = ''
+
+        messages = []
+        for message_index in range(1, message_count + 1):
+            timestamp_text, display_time = self.format_timestamp(timestamp)
+            timestamp += datetime.timedelta(seconds=self.random.randint(1, 3600))
+            if self.random.random() < 0.4:
+                cite = OUTGOING_CITE.format(number=own_number)
+            else:
+                name, number = self.random.choice(participants)
+                cite = CITE.format(name=name, number=number)
+            attachments = ''
+            if self.random.random() < media_rate:
+                template = self.random.choice([IMAGE, IMAGE, VIDEO, CONTACT])
+                media = f"{fname_base}-{message_index}-1"
+                attachments = template.format(media=media)
+                self.write_media(media, MEDIA_EXTENSIONS[template])
+            messages.append(MESSAGE.format(timestamp=timestamp_text, display_time=display_time, cite=cite,
+                                           text=self.sentence(), attachments=attachments))
+
+        data = self.text_head.format(title=title) + TEXT_BODY.format(
+            participants=participants_markup, messages=' '.join(messages),
+            tags=', '.join([TAGS['sms'], TAGS['inbox']]))
+        self.write(fname_base + '.html', data, message_count)
+
+
+def generate_takeout(outdir, calls=1000, voicemails=200, conversations=500, messages_per_conversation=20,
+                     group_conversations=10, messages_per_group=2000, group_size=8, media_rate=0.05, seed=0):
+    """Generates a synthetic takeout folder, returning its (file_count, record_count)"""
+    takeout = SyntheticTakeout(outdir, seed=seed)
+    for _ in range(calls):
+        takeout.call(takeout.random.choice(['Received', 'Placed', 'Missed']))
+    for _ in range(voicemails):
+        takeout.call('Voicemail')
+    for _ in range(conversations):
+        takeout.conversation(takeout.random.randint(1, 2 * messages_per_conversation), media_rate=media_rate)
+    for _ in range(group_conversations):
+        takeout.conversation(messages_per_group, participant_count=group_size, media_rate=media_rate)
+    return takeout.file_count, takeout.record_count
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generates a synthetic Google Voice Takeout folder')
+    parser.add_argument('outdir', help="The directory to write the HTML files to")
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help="Multiplies the number of files and the size of group conversations (default: 1)")
+    parser.add_argument('--seed', type=int, default=0)
+    parsed_args = parser.parse_args()
+    scale = parsed_args.scale
+    file_count, record_count = generate_takeout(
+        parsed_args.outdir, calls=int(1000 * scale), voicemails=int(200 * scale), conversations=int(500 * scale),
+        group_conversations=max(1, int(10 * scale)), messages_per_group=int(2000 * scale), seed=parsed_args.seed)
+    print(f"Wrote {file_count} files with {record_count} records to {parsed_args.outdir}")
+
+
+if __name__ == "__main__":
+    main()
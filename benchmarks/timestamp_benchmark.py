@@ -0,0 +1,48 @@
+"""Compares parse_timestamp and format_timestamp with the original strptime-based implementation.
+
+Run from the repository root:
+    python benchmarks/timestamp_benchmark.py --number 200000
+"""
+import argparse
+import datetime
+import timeit
+
+import google_voice_takeout_parser
+
+SAMPLE_TIMESTAMP = '2022-09-30T14:36:36.127-04:00'
+
+
+def strptime_timestamp(timestamp_text):
+    # The original implementation of parse_timestamp
+    timestamp_text_nocolon = "".join(timestamp_text.rsplit(':', 1))
+    return datetime.datetime.strptime(timestamp_text_nocolon, '%Y-%m-%dT%H:%M:%S.%f%z')
+
+
+CASES = {
+    'strptime': lambda: strptime_timestamp(SAMPLE_TIMESTAMP),
+    'strptime+strftime': lambda: strptime_timestamp(SAMPLE_TIMESTAMP).strftime(
+        google_voice_takeout_parser.RECORD_TIMESTAMP_FORMAT),
+    'parse_timestamp': lambda: google_voice_takeout_parser.parse_timestamp(SAMPLE_TIMESTAMP),
+    'format_timestamp': lambda: google_voice_takeout_parser.format_timestamp(SAMPLE_TIMESTAMP),
+    'timestamp_to_datetime': lambda: google_voice_takeout_parser.timestamp_to_datetime('2022-09-30 14:36:36 -0400'),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks the timestamp parsing functions')
+    parser.add_argument('--number', type=int, default=200000, help="Calls per function (default: 200000)")
+    parser.add_argument('--repeat', type=int, default=5, help="The best of this many runs is reported (default: 5)")
+    parsed_args = parser.parse_args()
+
+    print(f"{'function':<22} {'ns/call':>9} {'speedup':>8}")
+    baseline = None
+    for name, func in CASES.items():
+        seconds = min(timeit.repeat(func, number=parsed_args.number, repeat=parsed_args.repeat))
+        ns_per_call = 1e9 * seconds / parsed_args.number
+        if baseline is None:
+            baseline = ns_per_call
+        print(f"{name:<22} {ns_per_call:>9.0f} {baseline / ns_per_call:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,2 +1,17 @@
 from ._version import __version__ as __version__  # noqa: F401
 from .google_voice_takeout_parser import * # noqa: F401
+from .parse_cache import * # noqa: F401
+from .sqlite_output import * # noqa: F401
+from .columnar import * # noqa: F401
+from .profiling import * # noqa: F401
+from .record_index import * # noqa: F401
+from .record_filter import * # noqa: F401
+from .media_index import * # noqa: F401
+from .dedup import * # noqa: F401
+from .jsonl_output import * # noqa: F401
+from .error_report import * # noqa: F401
+from .progress import * # noqa: F401
+from .sources import * # noqa: F401
+from .sniffing import * # noqa: F401
+from .streaming import * # noqa: F401
+from .pipeline import * # noqa: F401
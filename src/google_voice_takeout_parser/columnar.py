@@ -0,0 +1,133 @@
+import itertools
+
+from .google_voice_takeout_parser import parse_duration, timestamp_to_datetime
+from .progress import _running
+
+
+# Columns whose values repeat heavily, so they are dictionary-encoded (categorical in pandas)
+DICTIONARY_COLUMNS = ['data_type', 'direction', 'originating_name', 'originating_phone_number', 'tags']
+
+STRING_COLUMNS = ['filename', 'transcript', 'text_message']
+
+LIST_COLUMNS = ['recipient_names', 'recipient_phone_numbers']
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as E:
+        raise ImportError("pyarrow is required for Parquet output. "
+                          "Install it with: pip install google-voice-takeout-parser[columnar]") from E
+    return pyarrow
+
+
+def _import_pandas():
+    try:
+        import pandas
+    except ImportError as E:
+        raise ImportError("pandas is required for to_dataframe. "
+                          "Install it with: pip install google-voice-takeout-parser[pandas]") from E
+    return pandas
+
+
+class ColumnBuffers:
+    """Typed, per-column buffers which records are appended to one at a time.
+
+    Each record's values are converted and the record itself is then discarded, so a list of
+    records is never built. Timestamps become timezone-aware datetimes and durations become
+    integer seconds (None where they don't apply).
+    """
+
+    def __init__(self):
+        self.columns = {name: [] for name in DICTIONARY_COLUMNS + STRING_COLUMNS + LIST_COLUMNS}
+        self.columns['timestamp'] = []
+        self.columns['duration'] = []
+        self.columns['user_deleted'] = []
+        self.columns['media_files'] = []
+
+    def __len__(self):
+        return len(self.columns['timestamp'])
+
+    def append(self, record):
+        for name in DICTIONARY_COLUMNS + STRING_COLUMNS:
+            self.columns[name].append(record[name])
+        for name in LIST_COLUMNS:
+            self.columns[name].append(list(record[name]))
+        self.columns['timestamp'].append(timestamp_to_datetime(record['timestamp']))
+        self.columns['duration'].append(parse_duration(record['duration']))
+        self.columns['user_deleted'].append(record['user_deleted'])
+        self.columns['media_files'].append([{'media_type': media_type, 'path': path}
+                                            for media_type, path in record['media_files']])
+
+    def extend(self, records):
+        for record in records:
+            self.append(record)
+
+    def to_arrow(self):
+        """Returns the buffered records as a pyarrow Table"""
+        pyarrow = _import_pyarrow()
+        arrays = {}
+        for name in DICTIONARY_COLUMNS:
+            arrays[name] = pyarrow.array(self.columns[name], pyarrow.string()).dictionary_encode()
+        for name in STRING_COLUMNS:
+            arrays[name] = pyarrow.array(self.columns[name], pyarrow.string())
+        for name in LIST_COLUMNS:
+            arrays[name] = pyarrow.array(self.columns[name], pyarrow.list_(pyarrow.string()))
+        # Arrow columns share one timezone, so timestamps are stored in UTC
+        arrays['timestamp'] = pyarrow.array(self.columns['timestamp'], pyarrow.timestamp('us', tz='UTC'))
+        arrays['duration'] = pyarrow.array(self.columns['duration'], pyarrow.int64())
+        arrays['user_deleted'] = pyarrow.array(self.columns['user_deleted'], pyarrow.bool_())
+        media_file_type = pyarrow.struct([('media_type', pyarrow.string()), ('path', pyarrow.string())])
+        arrays['media_files'] = pyarrow.array(self.columns['media_files'], pyarrow.list_(media_file_type))
+        return pyarrow.table({name: arrays[name] for name in sorted(arrays)})
+
+    def to_dataframe(self):
+        """Returns the buffered records as a pandas DataFrame"""
+        pandas = _import_pandas()
+        data = {}
+        for name in DICTIONARY_COLUMNS:
+            data[name] = pandas.Categorical(self.columns[name])
+        for name in STRING_COLUMNS + LIST_COLUMNS:
+            data[name] = self.columns[name]
+        data['timestamp'] = pandas.to_datetime(self.columns['timestamp'], utc=True)
+        data['duration'] = pandas.array(self.columns['duration'], dtype='Int64')
+        data['user_deleted'] = pandas.array(self.columns['user_deleted'], dtype='boolean')
+        data['media_files'] = [[(media_file['media_type'], media_file['path']) for media_file in media_files]
+                               for media_files in self.columns['media_files']]
+        return pandas.DataFrame({name: data[name] for name in sorted(data)})
+
+
+def to_dataframe(parsed_files):
+    """Builds a pandas DataFrame from the records, such as those yielded by iter_directory"""
+    buffers = ColumnBuffers()
+    buffers.extend(parsed_files)
+    return buffers.to_dataframe()
+
+
+def write_to_parquet(parquet_fpath, parsed_files, batch_size=100000, progress=None):
+    """Writes the records to a Parquet file, one row group per batch_size records, returning the number written"""
+    pyarrow = _import_pyarrow()
+    record_count = 0
+    with _running(progress):
+        writer = None
+        parsed_files = iter(parsed_files)
+        try:
+            while True:
+                buffers = ColumnBuffers()
+                buffers.extend(itertools.islice(parsed_files, batch_size))
+                table = buffers.to_arrow()
+                if writer is None:
+                    # Created even if there are no records, so that the output is always a valid Parquet file
+                    writer = pyarrow.parquet.ParquetWriter(parquet_fpath, table.schema)
+                if len(buffers):
+                    writer.write_table(table)
+                    record_count += len(buffers)
+                    if progress is not None:
+                        progress.add_written(len(buffers))
+                if len(buffers) < batch_size:
+                    break
+        finally:
+            if writer is not None:
+                writer.close()
+    return record_count
@@ -0,0 +1,73 @@
+import hashlib
+import sqlite3
+
+from .google_voice_takeout_parser import convert_timestamp
+
+
+def record_key(record):
+    """Returns a 16-byte key identifying a record, which is the same in every export it appears in.
+
+    The key covers the UTC time, the data type, the sender's number and the text or transcript.
+    The filename isn't part of it, since the same conversation can be split or named differently
+    across exports.
+    """
+    parts = [str(convert_timestamp(record['timestamp'], 'epoch')), record['data_type'],
+             record['originating_phone_number'] or '', record['text_message'] or '', record['transcript'] or '']
+    return hashlib.blake2b('\0'.join(parts).encode('utf-8'), digest_size=16).digest()
+
+
+class RecordDeduplicator:
+    """Drops records which were already seen, such as when merging overlapping Takeout exports.
+
+    Only the first copy of each record, compared by record_key, is kept. The keys are kept in a set
+    in memory, or in a SQLite file at db_fpath for exports too large for memory, where keys from an
+    earlier run count as seen.
+    """
+
+    def __init__(self, db_fpath=None, commit_interval=10000):
+        self.commit_interval = commit_interval
+        self.uncommitted = 0
+        self.keys = None
+        self.connection = None
+        if db_fpath is None:
+            self.keys = set()
+        else:
+            self.connection = sqlite3.connect(db_fpath)
+            self.connection.execute("CREATE TABLE IF NOT EXISTS record_keys (key BLOB PRIMARY KEY) WITHOUT ROWID")
+        self.duplicates = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def add(self, record):
+        """Returns True if the record is new, and remembers it, or False if it was already seen"""
+        key = record_key(record)
+        if self.keys is not None:
+            is_new = key not in self.keys
+            self.keys.add(key)
+        else:
+            # Looks up and adds the key in one statement
+            is_new = self.connection.execute("INSERT OR IGNORE INTO record_keys VALUES (?)", (key,)).rowcount == 1
+            self.uncommitted += 1
+            if self.uncommitted >= self.commit_interval:
+                self.commit()
+        if not is_new:
+            self.duplicates += 1
+        return is_new
+
+    def filter(self, records):
+        """Yields the records which weren't already seen"""
+        return (record for record in records if self.add(record))
+
+    def commit(self):
+        if self.connection is not None:
+            self.connection.commit()
+        self.uncommitted = 0
+
+    def close(self):
+        if self.connection is not None:
+            self.commit()
+            self.connection.close()
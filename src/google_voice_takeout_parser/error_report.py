@@ -0,0 +1,35 @@
+import json
+import os
+
+
+class ErrorReport:
+    """Collects the files which couldn't be parsed, instead of printing them, for writing as a JSON report.
+
+    Files taken out of the run by timeout or memory_limit go to quarantined, and every other failure
+    to errors. Each entry holds the filename, the path (None for files in a ZIP archive) and the reason.
+    """
+
+    def __init__(self):
+        self.errors = []
+        self.quarantined = []
+
+    def __len__(self):
+        return len(self.errors) + len(self.quarantined)
+
+    @staticmethod
+    def _entry(filename, path, reason):
+        return {'filename': filename, 'path': None if path is None else os.fspath(path), 'reason': reason}
+
+    def add_error(self, filename, path, reason):
+        self.errors.append(self._entry(filename, path, reason))
+
+    def add_quarantined(self, filename, path, reason):
+        self.quarantined.append(self._entry(filename, path, reason))
+
+    def to_dict(self):
+        return {'errors': self.errors, 'quarantined': self.quarantined}
+
+    def write(self, fpath):
+        with open(fpath, 'w', encoding='utf-8') as fh:
+            json.dump(self.to_dict(), fh, indent=2, ensure_ascii=False)
+            fh.write('\n')
@@ -0,0 +1,201 @@
+import collections
+import concurrent.futures
+import multiprocessing
+import multiprocessing.connection
+import os
+import time
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, where memory_limit isn't supported
+    resource = None
+
+
+# An error which took the whole file out of the run, such as a timeout, so the file should be quarantined
+_Quarantine = collections.namedtuple('_Quarantine', ['reason'])
+
+
+# Wraps a result which is already known, such as one from a ParseCache, so that _map_ordered can
+# keep it in order with the results which still need to be computed
+_Result = collections.namedtuple('_Result', ['value'])
+
+
+def _process_context():
+    """Returns the multiprocessing context that worker processes are started with.
+
+    Workers aren't forked, since this process can have threads running by then, such as those of
+    _read_ahead, and forking a multi-threaded process can deadlock the child.
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('forkserver')
+    return multiprocessing.get_context('spawn')
+
+
+def _map_ordered(func, items, workers=1):
+    """Yields func(item) for each item, in the same order as items.
+
+    Items which are a _Result are yielded as-is, without calling func.
+    With more than one worker, the calls are spread over a process pool. Only a bounded
+    number of calls are in flight at a time, so results don't pile up in memory.
+    """
+    if workers is None or workers < 1:
+        workers = os.cpu_count() or 1
+    if workers == 1:
+        for item in items:
+            if isinstance(item, _Result):
+                yield item.value
+            else:
+                yield func(item)
+        return
+
+    max_pending = workers * 4
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=_process_context()) as executor:
+        pending = collections.deque()
+        for item in items:
+            if isinstance(item, _Result):
+                pending.append(item)
+            else:
+                pending.append(executor.submit(func, item))
+            if len(pending) >= max_pending:
+                yield _pending_result(pending.popleft())
+        while pending:
+            yield _pending_result(pending.popleft())
+
+
+def _pending_result(pending):
+    if isinstance(pending, _Result):
+        return pending.value
+    return pending.result()
+
+
+def _isolated_worker_main(connection, func, memory_limit):
+    if memory_limit is not None:
+        # Counted from the worker's current size, which includes whatever it inherited from its parent
+        with open('/proc/self/statm', encoding='ascii') as fh:
+            current_size = int(fh.read().split()[0]) * os.sysconf('SC_PAGE_SIZE')
+        limit = current_size + memory_limit
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    while True:
+        item = connection.recv()
+        if item is None:
+            break
+        connection.send(func(item))
+
+
+class _IsolatedWorker:
+    """A worker process which parses one item at a time, and can be killed and replaced if it hangs"""
+
+    def __init__(self, func, memory_limit):
+        self.func = func
+        self.memory_limit = memory_limit
+        self.start()
+
+    def start(self):
+        context = _process_context()
+        self.connection, child_connection = context.Pipe()
+        self.process = context.Process(target=_isolated_worker_main,
+                                       args=(child_connection, self.func, self.memory_limit), daemon=True)
+        self.process.start()
+        child_connection.close()
+        # The position of the item being parsed, and when it times out
+        self.index = None
+        self.deadline = None
+
+    def submit(self, index, item, timeout):
+        self.index = index
+        self.deadline = None if timeout is None else time.monotonic() + timeout
+        self.connection.send(item)
+
+    def restart(self):
+        self.process.kill()
+        self.process.join()
+        self.connection.close()
+        self.start()
+
+    def close(self):
+        try:
+            self.connection.send(None)
+        except OSError:
+            pass
+        self.process.join(1)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.connection.close()
+
+
+def _map_isolated(func, items, workers=1, timeout=None, memory_limit=None):
+    """Yields func(item) for each item, in the same order as items, as for _map_ordered.
+
+    Each call runs in one of workers processes. A call which takes longer than timeout seconds, or
+    whose process dies, such as from exceeding memory_limit bytes, has its process killed and
+    replaced, and (None, _Quarantine(reason), None) is yielded for it instead.
+    """
+    if workers is None or workers < 1:
+        workers = os.cpu_count() or 1
+    if memory_limit is not None and (resource is None or not os.path.exists('/proc/self/statm')):
+        raise Exception("memory_limit is only supported on Linux!")
+    max_pending = workers * 4
+    isolated_workers = [_IsolatedWorker(func, memory_limit) for _ in range(workers)]
+    idle = list(isolated_workers)
+    # {connection: worker} for the workers which are parsing an item
+    busy = {}
+    # {position: result} for the results which can't be yielded yet
+    results = {}
+    items = iter(items)
+    next_item = None
+    items_left = True
+    item_count = 0
+    yield_index = 0
+    try:
+        while True:
+            # Hand out items, in order, until every worker is busy or too many results are waiting
+            while item_count - yield_index < max_pending:
+                if next_item is None:
+                    next_item = next(items, None)
+                    if next_item is None:
+                        items_left = False
+                        break
+                if isinstance(next_item, _Result):
+                    results[item_count] = next_item.value
+                elif idle:
+                    worker = idle.pop()
+                    worker.submit(item_count, next_item, timeout)
+                    busy[worker.connection] = worker
+                else:
+                    break
+                item_count += 1
+                next_item = None
+
+            while yield_index in results:
+                yield results.pop(yield_index)
+                yield_index += 1
+            if not busy:
+                if not items_left and yield_index == item_count:
+                    return
+                continue
+
+            wait_timeout = None
+            if timeout is not None:
+                wait_timeout = max(0, min(worker.deadline for worker in busy.values()) - time.monotonic())
+            for connection in multiprocessing.connection.wait(list(busy), wait_timeout):
+                worker = busy.pop(connection)
+                try:
+                    results[worker.index] = connection.recv()
+                except EOFError:
+                    worker.process.join()
+                    results[worker.index] = (None, _Quarantine(
+                        f"The worker process exited with code {worker.process.exitcode}"), None)
+                    worker.restart()
+                idle.append(worker)
+            now = time.monotonic()
+            for connection, worker in list(busy.items()):
+                if worker.deadline is not None and now >= worker.deadline:
+                    del busy[connection]
+                    results[worker.index] = (None, _Quarantine(f"Timed out after {timeout} seconds"), None)
+                    worker.restart()
+                    idle.append(worker)
+    finally:
+        for worker in isolated_workers:
+            worker.close()
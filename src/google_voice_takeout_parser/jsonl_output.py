@@ -0,0 +1,56 @@
+import datetime
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from .progress import _running
+
+
+# Records are written through a buffer this large, so large outputs need few write calls
+JSONL_BUFFER_SIZE = 1 << 20
+
+
+def _record_to_json(record):
+    """Returns a record as a dict of JSON types, with its list fields as arrays"""
+    data = dict(record)
+    if data['media_files'] is not None:
+        data['media_files'] = [{'media_type': media_type, 'path': path} for media_type, path in data['media_files']]
+    return data
+
+
+def _json_default(value):
+    # Timestamps are datetimes with timestamp_type='datetime'. orjson writes them the same way
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def write_to_jsonl(jsonl_fpath, parsed_files, use_orjson=True, progress=None):
+    """Writes the records to a JSON Lines file, one JSON object per line, returning the number of records written.
+
+    recipient_names and recipient_phone_numbers are written as arrays of strings, and media_files as
+    an array of {"media_type": ..., "path": ...} objects. orjson is used if it is installed
+    (pip install google-voice-takeout-parser[jsonl]) and use_orjson is set, and the json module
+    otherwise. Both write the same output.
+    """
+    record_count = 0
+    with open(jsonl_fpath, 'wb', buffering=JSONL_BUFFER_SIZE) as fh, _running(progress):
+        if use_orjson and orjson is not None:
+            for record in parsed_files:
+                fh.write(orjson.dumps(_record_to_json(record), default=_json_default,
+                                      option=orjson.OPT_APPEND_NEWLINE))
+                record_count += 1
+                if progress is not None:
+                    progress.add_written(1)
+        else:
+            encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'), default=_json_default)
+            for record in parsed_files:
+                fh.write(encoder.encode(_record_to_json(record)).encode('utf-8'))
+                fh.write(b'\n')
+                record_count += 1
+                if progress is not None:
+                    progress.add_written(1)
+    return record_count
@@ -0,0 +1,123 @@
+import filecmp
+import os
+import os.path
+import shutil
+
+# How MediaIndex can export the media files it resolves
+MEDIA_EXPORT_MODES = ('copy', 'hardlink')
+
+
+class MediaIndex:
+    """Finds the files that the media_files of records refer to.
+
+    Text message attachments are referenced by their filename without its extension, such as
+    'Joe Smith - Text - 2022-03-23T18_17_22Z-1-1' for a .jpg file. The index maps both the name
+    and the stem of every file in the takeout to its path, so each reference is resolved with a
+    single lookup instead of searching the directory. Build it once, with add_directory or
+    from_inputs, before resolving any records.
+
+    If export_dir is given, resolved files are also copied (or hard linked, with mode='hardlink')
+    into it, and the records refer to the copies instead. Different files with the same name,
+    such as from several exports, are exported as 'name (2).jpg' and so on.
+    """
+
+    def __init__(self, export_dir=None, mode='copy'):
+        if mode not in MEDIA_EXPORT_MODES:
+            raise Exception(f"Unknown media export mode {mode}!")
+        self.export_dir = export_dir
+        self.mode = mode
+        # {name or stem: path}. Names are added last, so they win over an equal stem of another file
+        self.paths = {}
+        # {path: export path} and {export path: path} of the files exported so far
+        self.export_paths = {}
+        self.exported_files = {}
+
+    def __len__(self):
+        return len(self.paths)
+
+    def add_file(self, path):
+        name = os.path.basename(path)
+        stem, extension = os.path.splitext(name)
+        if extension.lower() == '.html':
+            return
+        self.paths.setdefault(stem, path)
+        self.paths[name] = path
+
+    def add_directory(self, root, recursive=False):
+        """Adds the files in root, and in its subdirectories if recursive is set"""
+        directories = [root]
+        while directories:
+            with os.scandir(directories.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if recursive:
+                            directories.append(entry.path)
+                    else:
+                        self.add_file(entry.path)
+
+    @classmethod
+    def from_inputs(cls, inputs, recursive=False, **kwargs):
+        """Builds an index of the directories in inputs, as passed to iter_parsed_files.
+
+        Media files inside Takeout ZIP archives have no path, so archives are skipped.
+        Any keyword arguments are passed to MediaIndex.
+        """
+        index = cls(**kwargs)
+        if isinstance(inputs, (str, os.PathLike)):
+            inputs = [inputs]
+        for path in inputs:
+            if not os.fspath(path).lower().endswith('.zip'):
+                index.add_directory(path, recursive)
+        return index
+
+    def resolve(self, reference):
+        """Returns the path of the file a media reference refers to, or None if it isn't in the index"""
+        return self.paths.get(reference)
+
+    def resolve_records(self, records):
+        """Yields the records with the references in their media_files replaced by the files' paths.
+
+        References which can't be resolved are left unchanged.
+        """
+        for record in records:
+            if record.media_files:
+                record.media_files = tuple((media_type, self._resolve_file(reference))
+                                           for media_type, reference in record.media_files)
+            yield record
+
+    def _resolve_file(self, reference):
+        path = self.resolve(reference)
+        if path is None:
+            return reference
+        if self.export_dir is None:
+            return path
+        # The same attachment can be referenced by more than one record
+        export_path = self.export_paths.get(path)
+        if export_path is not None:
+            return export_path
+        os.makedirs(self.export_dir, exist_ok=True)
+        export_path = self._export_path(path)
+        self.export_paths[path] = export_path
+        self.exported_files[export_path] = path
+        if not os.path.exists(export_path):
+            if self.mode == 'hardlink':
+                try:
+                    os.link(path, export_path)
+                    return export_path
+                except OSError:
+                    # Such as when export_dir is on another file system
+                    pass
+            shutil.copy2(path, export_path)
+        return export_path
+
+    def _export_path(self, path):
+        """Returns the path in export_dir for path, which no other file is exported to"""
+        stem, extension = os.path.splitext(os.path.basename(path))
+        export_path = os.path.join(self.export_dir, stem + extension)
+        number = 1
+        # A file left by an earlier run is reused if it has the same contents
+        while export_path in self.exported_files or (os.path.exists(export_path)
+                                                    and not filecmp.cmp(path, export_path, shallow=True)):
+            number += 1
+            export_path = os.path.join(self.export_dir, f"{stem} ({number}){extension}")
+        return export_path
@@ -0,0 +1,123 @@
+import hashlib
+import os
+import os.path
+import pickle
+import sqlite3
+
+from ._version import __version__
+from .google_voice_takeout_parser import Record
+
+# The layout of the cached records. Bump this whenever the pickled record type changes, so that
+# caches written by older versions are discarded instead of returning records of the wrong type
+CACHE_FORMAT = '2'
+
+
+class ParseCache:
+    """An on-disk cache of parse_file results, stored in SQLite.
+
+    Entries are keyed by the file's absolute path, size and modification time, so only new or changed
+    files need to be parsed again. With hash_contents=True, a file whose modification time changed is
+    still served from the cache if its SHA-256 hash is unchanged, such as when a new export is
+    extracted over an old one.
+
+    Results are committed every commit_interval files, so an interrupted run can resume where it
+    stopped. The whole cache is invalidated when the parser version or CACHE_FORMAT changes, and an
+    entry which can't be loaded as a list of Records is treated as a miss. Only files in directories
+    are cached, not those in archives. Records are cached with the timestamps of the run which parsed
+    them, so those cached by a run with 'str' timestamps have no milliseconds.
+
+    Note: records are stored with pickle, so only open cache files you created.
+    """
+
+    def __init__(self, db_fpath, hash_contents=False, commit_interval=100):
+        self.hash_contents = hash_contents
+        self.commit_interval = commit_interval
+        self.uncommitted = 0
+        self.connection = sqlite3.connect(db_fpath)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS metadata (key TEXT PRIMARY KEY, value TEXT)")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, size INTEGER, "
+                                "mtime_ns INTEGER, content_hash TEXT, records BLOB)")
+        metadata = dict(self.connection.execute("SELECT key, value FROM metadata"))
+        if metadata.get('parser_version') != __version__ or metadata.get('cache_format') != CACHE_FORMAT:
+            self.connection.execute("DELETE FROM files")
+            self.connection.executemany("INSERT OR REPLACE INTO metadata VALUES (?, ?)",
+                                        [('parser_version', __version__), ('cache_format', CACHE_FORMAT)])
+        self.connection.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _hash_file(self, fpath):
+        with open(fpath, 'rb') as fh:
+            return hashlib.sha256(fh.read()).hexdigest()
+
+    @staticmethod
+    def _load_records(data):
+        try:
+            records = pickle.loads(data)
+        except Exception:
+            return None
+        if not isinstance(records, list) or not all(isinstance(record, Record) for record in records):
+            return None
+        return records
+
+    def lookup(self, fpath):
+        """Returns (key, records) for fpath. records is None if the file isn't cached.
+
+        The key should be passed to store() once the file has been parsed. If the file can't be
+        read, both are None, and the error is left to the parser to report.
+        """
+        path = os.path.abspath(fpath)
+        try:
+            stat_result = os.stat(path)
+        except OSError:
+            return None, None
+        key = [path, stat_result.st_size, stat_result.st_mtime_ns, None]
+        row = self.connection.execute("SELECT size, mtime_ns, content_hash, records FROM files WHERE path = ?",
+                                      (path,)).fetchone()
+        if row is None or row[0] != key[1]:
+            return key, None
+        if row[1] == key[2]:
+            return key, self._load_records(row[3])
+        if self.hash_contents:
+            try:
+                key[3] = self._hash_file(path)
+            except OSError:
+                return None, None
+            if row[2] == key[3]:
+                records = self._load_records(row[3])
+                if records is not None:
+                    # Same contents with a new modification time. Update it so the file isn't hashed next time.
+                    self.store(key, None)
+                return key, records
+        return key, None
+
+    def store(self, key, records):
+        """Saves the records for a key returned by lookup(). If records is None, only the key is updated."""
+        path, size, mtime_ns, content_hash = key
+        if self.hash_contents and content_hash is None:
+            try:
+                content_hash = self._hash_file(path)
+            except OSError:
+                # The file changed or disappeared since it was parsed, so its records aren't kept
+                return
+        if records is None:
+            self.connection.execute("UPDATE files SET size = ?, mtime_ns = ?, content_hash = ? WHERE path = ?",
+                                    (size, mtime_ns, content_hash, path))
+        else:
+            self.connection.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)",
+                                    (path, size, mtime_ns, content_hash, pickle.dumps(records)))
+        self.uncommitted += 1
+        if self.uncommitted >= self.commit_interval:
+            self.commit()
+
+    def commit(self):
+        self.connection.commit()
+        self.uncommitted = 0
+
+    def close(self):
+        self.commit()
+        self.connection.close()
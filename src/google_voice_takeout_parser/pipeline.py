@@ -0,0 +1,237 @@
+import collections
+import functools
+import os.path
+import time
+
+from .executors import _map_isolated, _map_ordered, _Quarantine, _Result
+from .google_voice_takeout_parser import (SUPPORTED_FILE_CLASSES, TIMESTAMP_TYPES, ContactTable, DataType,
+                                          _unknown_file_class_message, convert_timestamps, parse_str)
+from .profiling import PARSE_STAGES
+from .progress import _running
+from .sniffing import SNIFF_SIZE, _sniff_source, sniff_bytes
+from .sources import _ArchiveMember, _iter_sources, _read_ahead, _source_size
+from .streaming import iter_text_file
+
+
+class _RecordCounter:
+    """Counts the records taken from an iterable, and the time spent producing them"""
+
+    def __init__(self, records):
+        self.records = records
+        self.count = 0
+        self.seconds = 0.0
+
+    def __iter__(self):
+        records = iter(self.records)
+        while True:
+            start = time.perf_counter()
+            record = next(records, None)
+            self.seconds += time.perf_counter() - start
+            if record is None:
+                return
+            self.count += 1
+            yield record
+
+
+def _parse_seconds(stats):
+    # The time spent parsing a file, from its stats
+    return sum(stats.get(key, 0.0) for _, key in PARSE_STAGES)
+
+
+def _parse_file_task(source, backend='html5lib', profile=False, timestamp_type='str'):
+    """Parses a single file, returning (records, error, stats).
+
+    source is either a path or an _ArchiveMember. This runs inside worker processes, so any
+    exception is converted to a string to ensure it can always be sent back to the parent process.
+    stats is a dict of timings from parse_file if profile is set, and otherwise None.
+    Files are sniffed from the data read for parsing, so those with an unsupported file class are
+    reported without building their tree, and without being profiled.
+    """
+    stats = {} if profile else None
+    try:
+        start = time.perf_counter()
+        if isinstance(source, _ArchiveMember):
+            fname = source.filename
+            nbytes = len(source.data)
+            head = source.data[:SNIFF_SIZE]
+            data = source.data.decode('utf-8')
+        else:
+            fname = os.path.basename(source)
+            with open(source, encoding='utf-8') as fh:
+                data = fh.read()
+                nbytes = os.fstat(fh.fileno()).st_size
+            head = data[:SNIFF_SIZE].encode('utf-8')
+        if profile:
+            stats['bytes'] = nbytes
+            stats['read_seconds'] = time.perf_counter() - start
+        file_class = sniff_bytes(head).file_class
+        if file_class is not None and file_class not in SUPPORTED_FILE_CLASSES:
+            return None, _unknown_file_class_message(file_class), None
+        return parse_str(data, fname, backend, stats, timestamp_type), None, stats
+    except MemoryError:
+        return None, _Quarantine("Ran out of memory"), stats
+    except Exception as E:
+        return None, str(E), stats
+
+
+def _iter_streamed_records(f, fpath, report_error, timestamp_type='str'):
+    try:
+        yield from iter_text_file(fpath, timestamp_type=timestamp_type)
+    except Exception as E:
+        report_error(f, fpath, str(E))
+
+
+def iter_parsed_files(indir, workers=1, backend='html5lib', cache=None, profiler=None, stream_threshold=None,
+                      timestamp_type='str', contacts=None, read_ahead=0, data_types=None, record_filter=None,
+                      recursive=False, include=None, exclude=None, media_index=None, deduplicator=None,
+                      timeout=None, memory_limit=None, error_report=None, progress=None):
+    """Parses the HTML files in indir one at a time, yielding (filename, records) for each file.
+
+    indir is a directory, a Takeout ZIP archive, or a list of them, and recursive, include and exclude
+    select the files as for iter_html_files. Files which can't be parsed are reported and yield an
+    empty list of records. workers is the number of processes used for parsing, or None or 0 for one
+    per CPU, and the output is in the same order regardless. backend is as for parse_str, and
+    timestamp_type is one of TIMESTAMP_TYPES.
+    Conversation files of at least stream_threshold bytes are parsed with iter_text_file, and
+    read_ahead files are read in background threads ahead of the parser. data_types skips the files
+    of other DataTypes, as sniffed by sniff_file. With timeout (in seconds) or memory_limit (in bytes),
+    a file which exceeds either is quarantined instead of stalling the run.
+    The other arguments are optional instances of their classes: cache (ParseCache), profiler
+    (ParseProfiler), contacts (ContactTable, a new one by default), record_filter (RecordFilter),
+    media_index (MediaIndex), deduplicator (RecordDeduplicator), error_report (ErrorReport) and
+    progress (ProgressObserver).
+    """
+    if data_types is None and record_filter is not None:
+        data_types = record_filter.data_types
+    if data_types is not None:
+        data_types = frozenset(DataType(data_type) for data_type in data_types)
+    if contacts is None:
+        contacts = ContactTable()
+    if timestamp_type not in TIMESTAMP_TYPES:
+        raise Exception(f"Unknown timestamp type {timestamp_type}!")
+    # The cache can't hold epoch timestamps, which have lost their UTC offsets, so with a cache
+    # they are parsed as datetimes, and converted once they have been cached
+    parse_timestamp_type = timestamp_type
+    if cache is not None and timestamp_type == 'epoch':
+        parse_timestamp_type = 'datetime'
+    # The filename, path, size and cache key of every file handed to _map_ordered, in order
+    submitted = collections.deque()
+    # {filename: error} for the files whose errors haven't been passed to progress yet
+    reported_errors = {}
+
+    def report_error(f, path, error):
+        if progress is not None:
+            reported_errors[f] = error.reason if isinstance(error, _Quarantine) else error
+        if error_report is not None:
+            if isinstance(error, _Quarantine):
+                error_report.add_quarantined(f, path, error.reason)
+            else:
+                error_report.add_error(f, path, error)
+        else:
+            print(f"Exception when processing file {f}: {error.reason if isinstance(error, _Quarantine) else error}")
+
+    def tasks():
+        for f, source in _iter_sources(indir, recursive, include, exclude):
+            path = None if isinstance(source, _ArchiveMember) else source
+            if record_filter is not None and record_filter.skips_file(f):
+                continue
+            sniffed = None
+            if data_types is not None:
+                sniffed = _sniff_source(source)
+                if sniffed.data_type is not None and sniffed.data_type not in data_types:
+                    continue
+            # Only needed for the progress, so files aren't stat'ed otherwise
+            nbytes = None if progress is None else _source_size(source)
+            cache_key = None
+            if cache is not None and not isinstance(source, _ArchiveMember):
+                cache_key, records = cache.lookup(source)
+                if records is not None:
+                    # The cache holds the timestamps of whichever run parsed the file
+                    records = list(convert_timestamps(records, parse_timestamp_type))
+                    submitted.append((f, path, nbytes, None))
+                    yield _Result((records, None, None))
+                    continue
+            # Only large files are sniffed here, to find the conversations to stream. Any other file is
+            # sniffed by _parse_file_task, from the data it reads anyway, so it isn't opened twice
+            size = None
+            if stream_threshold is not None and not isinstance(source, _ArchiveMember):
+                size = _source_size(source) if nbytes is None else nbytes
+            if size is not None and size >= stream_threshold:
+                if sniffed is None:
+                    sniffed = _sniff_source(source)
+                if sniffed.file_class == 'hChatLog hfeed':
+                    submitted.append((f, path, nbytes, None))
+                    yield _Result((_iter_streamed_records(f, source, report_error, parse_timestamp_type), None, None))
+                    continue
+            submitted.append((f, path, nbytes, cache_key))
+            yield source
+
+    # The stats are also the parse time of each file for progress
+    parse_task = functools.partial(_parse_file_task, backend=backend,
+                                   profile=profiler is not None or progress is not None,
+                                   timestamp_type=parse_timestamp_type)
+    items = tasks()
+    if read_ahead:
+        items = _read_ahead(items, read_ahead)
+    if timeout is not None or memory_limit is not None:
+        results = _map_isolated(parse_task, items, workers, timeout, memory_limit)
+    else:
+        results = _map_ordered(parse_task, items, workers)
+    with _running(progress):
+        for result, error, stats in results:
+            f, path, nbytes, cache_key = submitted.popleft()
+            if stats is not None and profiler is not None:
+                profiler.add_file(f, stats, result)
+            if error is not None:
+                report_error(f, path, error)
+            elif cache_key is not None:
+                cache.store(cache_key, result)
+            if result:
+                records = contacts.intern_records(result)
+                if record_filter is not None:
+                    # Filtered after caching, so the cache always holds all of a file's records
+                    records = record_filter.filter(records)
+                if deduplicator is not None:
+                    records = deduplicator.filter(records)
+                if media_index is not None:
+                    records = media_index.resolve_records(records)
+                if parse_timestamp_type != timestamp_type:
+                    records = convert_timestamps(records, timestamp_type)
+                result = list(records) if isinstance(result, list) else records
+            if progress is None:
+                yield f, result or []
+                continue
+            counter = None
+            if result is not None and not isinstance(result, list):
+                counter = _RecordCounter(result)
+                result = iter(counter)
+            yield f, result or []
+            if counter is not None:
+                # Streamed files are parsed as their records are consumed
+                record_count, elapsed = counter.count, counter.seconds
+            else:
+                record_count, elapsed = len(result or []), None if stats is None else _parse_seconds(stats)
+            progress.add_file(f, path, nbytes, record_count, elapsed, reported_errors.pop(f, None))
+
+
+def iter_directory(indir, workers=1, **kwargs):
+    """Yields the records from all of the HTML files in indir, one at a time.
+
+    Unlike process_directory, only the records of the file currently being processed
+    are held in memory. Any other keyword arguments are passed to iter_parsed_files.
+    """
+    for _, records in iter_parsed_files(indir, workers, **kwargs):
+        yield from records
+
+
+def process_directory(indir, workers=1, **kwargs):
+    """Parses all of the HTML files in indir, returning the file count and a list of all the records.
+
+    Any other keyword arguments are passed to iter_parsed_files.
+    """
+    csv_entries = []
+    file_count = 0
+    for _, records in iter_parsed_files(indir, workers, **kwargs):
+        file_count += 1
+        csv_entries += records
+    return file_count, csv_entries
@@ -0,0 +1,102 @@
+import collections
+import heapq
+import os.path
+import time
+
+
+# The stages of parsing a file, in the order they happen, and the stats key holding their duration
+PARSE_STAGES = [
+    ('read', 'read_seconds'),
+    ('tree', 'tree_seconds'),
+    ('extract', 'extract_seconds'),
+]
+
+# Marks the end of the records in ParseProfiler.profile_write
+_END = object()
+
+
+class _StageTotals:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.bytes = 0
+
+
+class ParseProfiler:
+    """Collects per-stage timings while parsing and writing a takeout.
+
+    Writing is timed by wrapping the output writer with profile_write. report() summarizes the time
+    spent reading files, building HTML trees, extracting records and writing the output, per file class.
+    """
+
+    def __init__(self):
+        # {file_class: {stage: _StageTotals}}
+        self.stages = collections.defaultdict(lambda: collections.defaultdict(_StageTotals))
+        # (total_seconds, bytes, record_count, filename, file_class) of every parsed file
+        self.files = []
+
+    def add_stage(self, file_class, stage, seconds, nbytes):
+        totals = self.stages[file_class][stage]
+        totals.count += 1
+        totals.seconds += seconds
+        totals.bytes += nbytes
+
+    def add_file(self, filename, stats, records=None):
+        """Records the stats of a file from parse_file. records is the file's parsed records, if any"""
+        file_class = stats.get('file_class') or 'unknown'
+        nbytes = stats.get('bytes', 0)
+        total_seconds = 0.0
+        for stage, key in PARSE_STAGES:
+            if key in stats:
+                self.add_stage(file_class, stage, stats[key], nbytes)
+                total_seconds += stats[key]
+        self.files.append((total_seconds, nbytes, len(records or []), filename, file_class))
+
+    def profile_write(self, write_func, fpath, parsed_files):
+        """Calls write_func(fpath, parsed_files) and records the time spent writing.
+
+        The time spent producing the records, such as parsing when parsed_files is a generator,
+        isn't counted as writing.
+        """
+        produce_seconds = 0.0
+
+        def timed_records():
+            nonlocal produce_seconds
+            records = iter(parsed_files)
+            while True:
+                start = time.perf_counter()
+                record = next(records, _END)
+                produce_seconds += time.perf_counter() - start
+                if record is _END:
+                    return
+                yield record
+
+        start = time.perf_counter()
+        result = write_func(fpath, timed_records())
+        write_seconds = time.perf_counter() - start - produce_seconds
+        self.add_stage('output', 'write', write_seconds, os.path.getsize(fpath))
+        return result
+
+    def report(self, top_n=10):
+        """Returns a human-readable summary of the timings, listing the top_n slowest and largest files"""
+        lines = []
+        lines.append(f"{'file class':<16} {'stage':<8} {'files':>7} {'total s':>9} {'ms/file':>9} {'MiB/s':>9}")
+        for file_class in sorted(self.stages):
+            for stage, totals in self.stages[file_class].items():
+                per_file = 1000 * totals.seconds / totals.count
+                throughput = f"{totals.bytes / 2**20 / totals.seconds:.2f}" if totals.seconds else '-'
+                lines.append(f"{file_class:<16} {stage:<8} {totals.count:>7} {totals.seconds:>9.3f} "
+                             f"{per_file:>9.3f} {throughput:>9}")
+
+        lines.append('')
+        lines.append(f"Slowest {top_n} files:")
+        for total_seconds, nbytes, record_count, filename, file_class in heapq.nlargest(top_n, self.files):
+            lines.append(f"  {1000 * total_seconds:9.3f} ms  {nbytes:>10} bytes  {record_count:>6} records  "
+                         f"{file_class}  {filename}")
+        lines.append(f"Largest {top_n} files:")
+        for total_seconds, nbytes, record_count, filename, file_class in heapq.nlargest(
+                top_n, self.files, key=lambda f: f[1]):
+            lines.append(f"  {nbytes:>10} bytes  {1000 * total_seconds:9.3f} ms  {record_count:>6} records  "
+                         f"{file_class}  {filename}")
+        return '\n'.join(lines)
+
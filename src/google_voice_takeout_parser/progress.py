@@ -0,0 +1,133 @@
+import collections
+import contextlib
+import threading
+import time
+
+
+# A file which iter_parsed_files is done with, passed to ProgressObserver.file_done
+FileProgress = collections.namedtuple('FileProgress', ['filename', 'path', 'bytes', 'records', 'elapsed', 'error'])
+
+# The running totals passed to ProgressObserver.update
+ProgressTotals = collections.namedtuple('ProgressTotals', [
+    'files', 'errors', 'bytes', 'records', 'records_written', 'elapsed',
+    'files_per_second', 'records_per_second', 'bytes_per_second',
+])
+
+
+class ProgressObserver:
+    """Receives the progress of parsing and writing a takeout, such as for exporting metrics or detecting stalls.
+
+    Override either of:
+    - file_done(event), called with a FileProgress once the records of each file have been consumed.
+      path is None for files in archives, bytes is the file's size, records is the number of
+      records yielded, and error is the reason the file couldn't be parsed, or None. elapsed is
+      the time in seconds spent parsing the file, in whichever process parsed it, or None if it
+      wasn't parsed, such as when it was served from the cache or quarantined.
+    - update(totals), called with a ProgressTotals every interval seconds from the time the run
+      starts, and again when parsing or writing is finished. The updates come from a background
+      thread, so they keep coming while a file takes a long time to parse, and a stall shows as
+      totals which stop changing. records_written counts the records written by a writer.
+      With an interval of 0, update is instead called after every file, and no thread is started.
+    Without an observer none of this is tracked, so there is no overhead.
+    """
+
+    def __init__(self, interval=1.0):
+        self.interval = interval
+        self.start_time = None
+        self.last_update = None
+        self.files = 0
+        self.errors = 0
+        self.bytes = 0
+        self.records = 0
+        self.records_written = 0
+        # Held while calling update, which can happen on the timer thread or the thread of the run
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._timer = None
+        # How many runs (parsing, writing) are using the observer, of which the last to end finishes it
+        self._runs = 0
+
+    def file_done(self, event):
+        pass
+
+    def update(self, totals):
+        pass
+
+    def start(self):
+        if self.start_time is not None:
+            return
+        self.start_time = self.last_update = time.monotonic()
+        if self.interval > 0:
+            self._timer = threading.Thread(target=self._tick, daemon=True)
+            self._timer.start()
+
+    def totals(self):
+        elapsed = 0.0 if self.start_time is None else time.monotonic() - self.start_time
+
+        def rate(count):
+            return count / elapsed if elapsed > 0 else 0.0
+
+        return ProgressTotals(self.files, self.errors, self.bytes, self.records, self.records_written, elapsed,
+                              rate(self.files), rate(self.records), rate(self.bytes))
+
+    def add_file(self, filename, path, nbytes, record_count, elapsed, error=None):
+        self.start()
+        self.files += 1
+        if error is not None:
+            self.errors += 1
+        self.bytes += nbytes or 0
+        self.records += record_count
+        self.file_done(FileProgress(filename, path, nbytes, record_count, elapsed, error))
+        if self.interval <= 0:
+            self._update()
+
+    def add_written(self, record_count):
+        self.start()
+        self.records_written += record_count
+
+    def stop(self):
+        """Stops the timer, such as when a run is abandoned before it finishes"""
+        self._stopped.set()
+
+    def finish(self):
+        """Stops the timer and sends the final update"""
+        self.start()
+        self.stop()
+        self._update()
+
+    def _update(self):
+        with self._lock:
+            self.last_update = time.monotonic()
+            self.update(self.totals())
+
+    def _tick(self):
+        while not self._stopped.wait(max(self.last_update + self.interval - time.monotonic(), 0)):
+            with self._lock:
+                # finish may have sent the final update while this thread waited for the lock
+                if self._stopped.is_set():
+                    return
+                if time.monotonic() - self.last_update >= self.interval:
+                    self.last_update = time.monotonic()
+                    self.update(self.totals())
+
+
+@contextlib.contextmanager
+def _running(progress):
+    """Starts progress, if it isn't None, for a run, and finishes it when the run and any enclosing run finish.
+
+    The timer is stopped however the run ends, such as when its generator is closed early.
+    """
+    if progress is None:
+        yield
+        return
+    progress.start()
+    progress._runs += 1
+    try:
+        yield
+    except BaseException:
+        progress._runs -= 1
+        progress.stop()
+        raise
+    progress._runs -= 1
+    if not progress._runs:
+        progress.finish()
@@ -0,0 +1,106 @@
+import collections
+import datetime
+import re
+
+from .google_voice_takeout_parser import DataType, convert_timestamp
+
+
+# The details in the name of a Takeout HTML file, from parse_filename
+FilenameMetadata = collections.namedtuple('FilenameMetadata', ['contact', 'data_type', 'timestamp'])
+
+# The kind in a filename, such as 'Joe Smith - Voicemail - 2022-10-24T22_26_52Z.html'
+FILENAME_DATA_TYPES = {
+    'Placed': DataType.OUTGOING_CALL,
+    'Received': DataType.INCOMING_CALL,
+    'Missed': DataType.MISSED_CALL,
+    'Voicemail': DataType.VOICEMAIL,
+    'Recorded': DataType.RECORDED_CALL,
+    'Text': DataType.TEXT_MESSAGE,
+}
+
+_FILENAME_TIMESTAMP = r'(?P<timestamp>\d{4}-\d{2}-\d{2}T\d{2}_\d{2}_\d{2}Z)'
+# The contact comes first, and can itself contain ' - ', such as 'Joe Smith - Cell'
+_FILENAME_PATTERN = re.compile(r'(?P<contact>.*) - (?P<kind>' + '|'.join(FILENAME_DATA_TYPES) + ') - '
+                               + _FILENAME_TIMESTAMP + r'\.html')
+_GROUP_FILENAME_PATTERN = re.compile(r'Group Conversation - ' + _FILENAME_TIMESTAMP + r'\.html')
+_PHONE_NUMBER_PATTERN = re.compile(r'\+?\d+')
+
+
+def parse_filename(fname):
+    """Returns the FilenameMetadata of a Takeout HTML file, or None if its name doesn't follow the Takeout layout.
+
+    contact is the other party's name or number ('' if there is none, or for group conversations),
+    data_type is a DataType and timestamp is a UTC datetime. For calls, the timestamp is the call's,
+    to the second. Conversations are named after one of their messages only.
+    """
+    match = _FILENAME_PATTERN.fullmatch(fname)
+    if match is not None:
+        contact = match.group('contact')
+        data_type = FILENAME_DATA_TYPES[match.group('kind')]
+    else:
+        match = _GROUP_FILENAME_PATTERN.fullmatch(fname)
+        if match is None:
+            return None
+        contact = ''
+        data_type = DataType.TEXT_MESSAGE
+    timestamp = datetime.datetime.strptime(match.group('timestamp'), '%Y-%m-%dT%H_%M_%SZ')
+    return FilenameMetadata(contact, data_type, timestamp.replace(tzinfo=datetime.timezone.utc))
+
+
+class RecordFilter:
+    """Selects the records to process, skipping whole files from their names where possible.
+
+    Files which skips_file rules out are never opened, and the records of the other files are
+    checked one by one with matches. Every condition given must match:
+    - since (inclusive) and until (exclusive) bound the timestamp. Each can be a record timestamp
+      string, a datetime or an epoch integer, as for convert_timestamp.
+    - data_types is a list of DataTypes, or their values, such as 'VOICEMAIL'.
+    - contacts is a list of names and phone numbers, one of which must exactly match the sender
+      or a recipient.
+    """
+
+    def __init__(self, since=None, until=None, data_types=None, contacts=None):
+        self.since = None if since is None else convert_timestamp(since, 'epoch')
+        self.until = None if until is None else convert_timestamp(until, 'epoch')
+        # Held as plain strings, which is how records return their data_type
+        self.data_types = None if data_types is None else frozenset(DataType(data_type).value
+                                                                    for data_type in data_types)
+        self.contacts = None if contacts is None else frozenset(contacts)
+
+    def skips_file(self, fname):
+        """Returns True if the filename alone shows that none of the file's records match"""
+        metadata = parse_filename(fname)
+        if metadata is None:
+            return False
+        if self.data_types is not None and metadata.data_type.value not in self.data_types:
+            return True
+        if metadata.data_type == DataType.TEXT_MESSAGE:
+            # A conversation's messages span any amount of time, and its participants can change
+            return False
+        # A call is a single record, at the time in its filename
+        epoch = int(metadata.timestamp.timestamp())
+        if (self.since is not None and epoch < self.since) or (self.until is not None and epoch >= self.until):
+            return True
+        # Only numbers are compared, since names in filenames may be shortened or have characters replaced
+        if self.contacts is not None and _PHONE_NUMBER_PATTERN.fullmatch(metadata.contact):
+            if all(_PHONE_NUMBER_PATTERN.fullmatch(contact) for contact in self.contacts):
+                return metadata.contact not in self.contacts
+        return False
+
+    def matches(self, record):
+        if self.data_types is not None and record['data_type'] not in self.data_types:
+            return False
+        if self.since is not None or self.until is not None:
+            epoch = convert_timestamp(record['timestamp'], 'epoch')
+            if (self.since is not None and epoch < self.since) or (self.until is not None and epoch >= self.until):
+                return False
+        if self.contacts is not None:
+            parties = {record['originating_name'], record['originating_phone_number'],
+                       *(record['recipient_names'] or []), *(record['recipient_phone_numbers'] or [])}
+            if self.contacts.isdisjoint(parties):
+                return False
+        return True
+
+    def filter(self, records):
+        """Yields the records which match"""
+        return (record for record in records if self.matches(record))
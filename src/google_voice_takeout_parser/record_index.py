@@ -0,0 +1,114 @@
+import array
+import bisect
+import collections
+
+from .google_voice_takeout_parser import DataType, convert_timestamp
+
+
+class RecordIndex:
+    """An in-memory index of records, for looking them up without scanning every record.
+
+    Records are added with add() or extend(), so the index can be built from the list returned by
+    process_directory or incrementally from a generator such as iter_directory. Each record gets
+    an integer ID, its position in self.records. The index holds:
+    - maps from each phone number and name, sending or receiving, to the IDs of its records
+    - a map from each filename to the IDs of its records, grouping the messages of each conversation
+    - a map from each data type to the IDs of its records
+    - the IDs sorted by timestamp, for range queries, which is rebuilt after records are added
+    """
+
+    def __init__(self, records=()):
+        self.records = []
+        self.by_phone_number = collections.defaultdict(list)
+        self.by_name = collections.defaultdict(list)
+        self.by_filename = collections.defaultdict(list)
+        # Keyed by the DataType's value, such as 'VOICEMAIL'
+        self.by_data_type = collections.defaultdict(list)
+        # The epoch timestamp of each record, by ID
+        self.epochs = array.array('q')
+        # The IDs, and their epoch timestamps, sorted by timestamp. None until the next range query
+        self._sorted_ids = None
+        self._sorted_epochs = None
+        self.extend(records)
+
+    def __len__(self):
+        return len(self.records)
+
+    def add(self, record):
+        """Adds a record to the index, returning its ID"""
+        record_id = len(self.records)
+        self.records.append(record)
+        self.epochs.append(convert_timestamp(record['timestamp'], 'epoch'))
+        # A number or name can appear as both the sender and a recipient, but is indexed once
+        phone_numbers = {record['originating_phone_number'], *(record['recipient_phone_numbers'] or [])}
+        for phone_number in phone_numbers:
+            if phone_number:
+                self.by_phone_number[phone_number].append(record_id)
+        names = {record['originating_name'], *(record['recipient_names'] or [])}
+        for name in names:
+            if name:
+                self.by_name[name].append(record_id)
+        self.by_filename[record['filename']].append(record_id)
+        self.by_data_type[record['data_type']].append(record_id)
+        self._sorted_ids = None
+        return record_id
+
+    def extend(self, records):
+        for record in records:
+            self.add(record)
+
+    def _sort_by_timestamp(self):
+        if self._sorted_ids is None:
+            self._sorted_ids = array.array('q', sorted(range(len(self.records)), key=self.epochs.__getitem__))
+            self._sorted_epochs = array.array('q', (self.epochs[record_id] for record_id in self._sorted_ids))
+
+    def _ids_in_range(self, start, end):
+        self._sort_by_timestamp()
+        low = 0 if start is None else bisect.bisect_left(self._sorted_epochs, start)
+        high = len(self._sorted_epochs) if end is None else bisect.bisect_left(self._sorted_epochs, end)
+        return self._sorted_ids[low:high]
+
+    def conversation(self, filename):
+        """Returns the records parsed from filename, in the order they appear in the file"""
+        return [self.records[record_id] for record_id in self.by_filename.get(filename, [])]
+
+    def query(self, phone_number=None, name=None, filename=None, start=None, end=None, data_type=None):
+        """Returns the records matching all of the given conditions, sorted by timestamp.
+
+        phone_number and name match the sender or any recipient exactly. start is inclusive and end
+        is exclusive, and both can be a record timestamp string, a datetime or an epoch integer, as for
+        convert_timestamp. data_type is a DataType or its value, such as 'TEXT_MESSAGE'.
+        """
+        start = None if start is None else convert_timestamp(start, 'epoch')
+        end = None if end is None else convert_timestamp(end, 'epoch')
+        # The IDs matching each condition, with a check of whether a record matches it
+        keyed_ids = []
+        if phone_number is not None:
+            keyed_ids.append((self.by_phone_number.get(phone_number, []),
+                              lambda record: phone_number == record['originating_phone_number']
+                              or phone_number in (record['recipient_phone_numbers'] or [])))
+        if name is not None:
+            keyed_ids.append((self.by_name.get(name, []),
+                              lambda record: name == record['originating_name']
+                              or name in (record['recipient_names'] or [])))
+        if filename is not None:
+            keyed_ids.append((self.by_filename.get(filename, []), lambda record: record['filename'] == filename))
+        if data_type is not None:
+            data_type = DataType(data_type).value
+            keyed_ids.append((self.by_data_type.get(data_type, []), lambda record: record['data_type'] == data_type))
+
+        if keyed_ids:
+            # Start from the smallest list of IDs and check the other conditions on its records,
+            # so the cost depends on the matches, not the index size
+            keyed_ids.sort(key=lambda keyed: len(keyed[0]))
+            ids, _ = keyed_ids[0]
+            for _, matches in keyed_ids[1:]:
+                ids = [record_id for record_id in ids if matches(self.records[record_id])]
+            epochs = self.epochs
+            ids = [record_id for record_id in ids
+                   if (start is None or epochs[record_id] >= start) and (end is None or epochs[record_id] < end)]
+            ids.sort(key=epochs.__getitem__)
+        else:
+            ids = self._ids_in_range(start, end)
+
+        return [self.records[record_id] for record_id in ids]
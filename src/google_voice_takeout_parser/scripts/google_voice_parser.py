@@ -1,5 +1,10 @@
 import argparse
+import datetime
+import functools
+import os.path
+import queue
 import sys
+import threading
 
 import tkinter
 import tkinter.ttk
@@ -10,15 +15,195 @@ import tkinter.messagebox
 import google_voice_takeout_parser
 
 
+# The functions for writing each of the supported output formats
+OUTPUT_FORMATS = {
+    'csv': google_voice_takeout_parser.write_to_csv,
+    'sqlite': google_voice_takeout_parser.write_to_sqlite,
+    'parquet': google_voice_takeout_parser.write_to_parquet,
+    'jsonl': google_voice_takeout_parser.write_to_jsonl,
+}
+
+# How often the GUI checks on a run in the background, in milliseconds
+GUI_POLL_INTERVAL = 100
+
+
+class _RunCancelled(Exception):
+    pass
+
+
+class ProgressPrinter(google_voice_takeout_parser.ProgressObserver):
+    """Shows the progress of a run on a single line of stderr, for --progress"""
+
+    def update(self, totals):
+        print(f"\r{totals.files} files, {totals.errors} errors, {totals.records} records, "
+              f"{totals.records_written} written, "
+              f"{totals.records_per_second:.0f} records/s, {totals.bytes_per_second / 2**20:.1f} MiB/s",
+              end='', file=sys.stderr, flush=True)
+
+    def finish(self):
+        super().finish()
+        print(file=sys.stderr)
+
+
+class _GuiProgress(google_voice_takeout_parser.ProgressObserver):
+    """Passes the progress of a run in the background to the GUI, and stops the run once it is cancelled"""
+
+    def __init__(self, cancel_event, updates):
+        super().__init__(interval=GUI_POLL_INTERVAL / 1000)
+        self.cancel_event = cancel_event
+        self.updates = updates
+
+    def file_done(self, event):
+        if self.cancel_event.is_set():
+            raise _RunCancelled()
+
+    def update(self, totals):
+        self.updates.put(('progress', totals))
+
+
+def parse_date(text):
+    """Parses a --since or --until date, such as '2022-10-01' or '2022-10-01T12:00-04:00', defaulting to UTC"""
+    timestamp = datetime.datetime.fromisoformat(text)
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=datetime.timezone.utc)
+    return timestamp
+
+
+def write_directory(indir, outfile, workers=1, output_format='csv', profiler=None, **kwargs):
+    """Streams the records from indir to outfile, returning the number of files parsed"""
+    file_count = 0
+
+    def records():
+        nonlocal file_count
+        for _, file_records in google_voice_takeout_parser.iter_parsed_files(indir, workers, profiler=profiler,
+                                                                             **kwargs):
+            file_count += 1
+            yield from file_records
+
+    write = functools.partial(OUTPUT_FORMATS[output_format], progress=kwargs.get('progress'))
+    if profiler is None:
+        write(outfile, records())
+    else:
+        profiler.profile_write(write, outfile, records())
+    return file_count
+
+
 def cli_main():
     parser = argparse.ArgumentParser(description='Parses a Google Voice Takeout folder and turns it into a CSV')
-    parser.add_argument('indir', help="The directory containing the HTML files")
-    parser.add_argument('outfile', help="The CSV file that should be written")
+    parser.add_argument('indir', nargs='+',
+                        help="The directory containing the HTML files, or the Takeout ZIP archive(s)")
+    parser.add_argument('outfile', help="The CSV file (or other --format) that should be written")
+    parser.add_argument('-r', '--recursive', action='store_true',
+                        help="Also parse the HTML files in subdirectories of each input directory")
+    parser.add_argument('--include', action='append', metavar='GLOB',
+                        help="Only parse files matching this glob, such as '*Voicemail*'. Can be given more than once")
+    parser.add_argument('--exclude', action='append', metavar='GLOB',
+                        help="Skip files or subdirectories matching this glob. Can be given more than once")
+    parser.add_argument('--format', choices=sorted(OUTPUT_FORMATS), default='csv',
+                        help="The output format. 'sqlite' writes an indexed database, 'parquet' requires pyarrow and "
+                             "'jsonl' writes one JSON object per line (default: csv)")
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help="The number of processes to parse with. Use 0 for one per CPU (default: 1)")
+    parser.add_argument('--backend', choices=sorted(google_voice_takeout_parser.PARSER_BACKENDS), default='html5lib',
+                        help="The HTML parser to use. 'fast' falls back to html5lib for files it can't parse")
+    parser.add_argument('--cache', help="A cache file used to skip parsing files that didn't change since the last run")
+    parser.add_argument('--cache-hash', action='store_true',
+                        help="Also reuse cached results for files whose contents are unchanged but were modified")
+    parser.add_argument('--stream-threshold', type=float, metavar='MiB',
+                        help="Parse conversation files larger than this incrementally, to limit memory use")
+    parser.add_argument('--read-ahead', type=int, default=0, metavar='N',
+                        help="Read up to N files ahead of the parser in background threads, for slow storage "
+                             "such as NFS (default: 0)")
+    parser.add_argument('--since', type=parse_date, metavar='DATE',
+                        help="Only output records from this date or time on, such as 2022-10-01 (UTC by default)")
+    parser.add_argument('--until', type=parse_date, metavar='DATE',
+                        help="Only output records from before this date or time")
+    parser.add_argument('--type', action='append', dest='data_types',
+                        choices=[data_type.value for data_type in google_voice_takeout_parser.DataType],
+                        help="Only output records of this type. Can be given more than once")
+    parser.add_argument('--contact', action='append', dest='contacts',
+                        help="Only output records to or from this exact name or phone number. Can be given more "
+                             "than once")
+    parser.add_argument('--dedupe', action='store_true',
+                        help="Only output the first copy of each record, such as when merging overlapping exports")
+    parser.add_argument('--dedupe-db', metavar='FILE',
+                        help="Like --dedupe, but keeps track of the records in this file instead of in memory, for "
+                             "very large exports. Records already in it are skipped")
+    parser.add_argument('--media', choices=['resolve'] + list(google_voice_takeout_parser.MEDIA_EXPORT_MODES),
+                        help="Replace media references with the paths of their files. 'copy' and 'hardlink' also "
+                             "put the files in a folder next to the output, named after it with '_media'")
+    parser.add_argument('--timeout', type=float, metavar='SECONDS',
+                        help="Parse each file in a worker process, which is restarted if a file takes longer than "
+                             "this. Such files are quarantined instead of stalling the run")
+    parser.add_argument('--memory-limit', type=float, metavar='MiB',
+                        help="Like --timeout, but quarantines files which need more than this much memory to parse "
+                             "(Linux only)")
+    parser.add_argument('--error-report', metavar='FILE',
+                        help="Write the files that couldn't be parsed, and the quarantined files, to this JSON file "
+                             "instead of printing them")
+    parser.add_argument('--progress', action='store_true',
+                        help="Show the number of files and records parsed so far, and the throughput, on stderr")
+    parser.add_argument('--profile', type=int, nargs='?', const=10, metavar='N',
+                        help="Print the time spent in each stage, and the N slowest and largest files (default: 10)")
     parsed_args = parser.parse_args()
     indir = parsed_args.indir
     outfile = parsed_args.outfile
-    file_count, csv_entries = google_voice_takeout_parser.process_directory(indir)
-    google_voice_takeout_parser.write_to_csv(outfile, csv_entries)
+    profiler = None
+    if parsed_args.profile is not None:
+        profiler = google_voice_takeout_parser.ParseProfiler()
+    stream_threshold = None
+    if parsed_args.stream_threshold is not None:
+        stream_threshold = int(parsed_args.stream_threshold * 2**20)
+    record_filter = None
+    if any(value is not None for value in (parsed_args.since, parsed_args.until, parsed_args.data_types,
+                                           parsed_args.contacts)):
+        record_filter = google_voice_takeout_parser.RecordFilter(parsed_args.since, parsed_args.until,
+                                                                 parsed_args.data_types, parsed_args.contacts)
+    media_index = None
+    if parsed_args.media == 'resolve':
+        media_index = google_voice_takeout_parser.MediaIndex.from_inputs(indir, parsed_args.recursive)
+    elif parsed_args.media is not None:
+        media_index = google_voice_takeout_parser.MediaIndex.from_inputs(
+            indir, parsed_args.recursive, export_dir=os.path.splitext(outfile)[0] + '_media', mode=parsed_args.media)
+    deduplicator = None
+    if parsed_args.dedupe or parsed_args.dedupe_db:
+        deduplicator = google_voice_takeout_parser.RecordDeduplicator(parsed_args.dedupe_db)
+    memory_limit = None
+    if parsed_args.memory_limit is not None:
+        memory_limit = int(parsed_args.memory_limit * 2**20)
+    error_report = None
+    if parsed_args.error_report:
+        error_report = google_voice_takeout_parser.ErrorReport()
+    progress = None
+    if parsed_args.progress:
+        progress = ProgressPrinter()
+    cache = None
+    if parsed_args.cache:
+        cache = google_voice_takeout_parser.ParseCache(parsed_args.cache, hash_contents=parsed_args.cache_hash)
+    try:
+        file_count = write_directory(indir, outfile, workers=parsed_args.jobs, output_format=parsed_args.format,
+                                     backend=parsed_args.backend, cache=cache, profiler=profiler,
+                                     stream_threshold=stream_threshold, read_ahead=parsed_args.read_ahead,
+                                     record_filter=record_filter, recursive=parsed_args.recursive,
+                                     include=parsed_args.include, exclude=parsed_args.exclude, media_index=media_index,
+                                     deduplicator=deduplicator, timeout=parsed_args.timeout,
+                                     memory_limit=memory_limit, error_report=error_report, progress=progress)
+    finally:
+        if cache is not None:
+            cache.close()
+        if deduplicator is not None:
+            deduplicator.close()
+        if error_report is not None:
+            error_report.write(parsed_args.error_report)
+        if progress is not None:
+            progress.stop()
+    if profiler is not None:
+        print(profiler.report(parsed_args.profile), file=sys.stderr)
+    if deduplicator is not None:
+        print(f"Skipped {deduplicator.duplicates} duplicate records")
+    if error_report is not None and len(error_report):
+        print(f"Couldn't parse {len(error_report.errors)} files and quarantined {len(error_report.quarantined)} "
+              f"files, see {parsed_args.error_report}")
     print(f"Completed parsing {file_count} files")
 
 
@@ -59,19 +244,115 @@ class ProcessHTML:
         # And the text entry
         tkinter.Entry(destGroup, textvariable=self.destpath, width=150).grid(row=0, column=2)
 
-        # Then a button to run:
-        chooseSave = tkinter.Button(master, text="Run", command=self.process_google_voice_directory)
-        chooseSave.grid(row=2, column=0)
+        # Then buttons to run and cancel:
+        buttonGroup = tkinter.Frame(master)
+        buttonGroup.grid(row=2, column=0)
+        self.run_button = tkinter.Button(buttonGroup, text="Run", command=self.process_google_voice_directory)
+        self.run_button.grid(row=0, column=0)
+        self.cancel_button = tkinter.Button(buttonGroup, text="Cancel", command=self.cancel, state='disabled')
+        self.cancel_button.grid(row=0, column=1)
+
+        # And the progress of the current run
+        progressGroup = tkinter.LabelFrame(master, text="Progress", padx=5, pady=5)
+        progressGroup.grid(row=3, column=0, sticky='WE')
+        progressGroup.columnconfigure(0, weight=1)
+        self.progress_bar = tkinter.ttk.Progressbar(progressGroup, mode='determinate')
+        self.progress_bar.grid(row=0, column=0, sticky='WE')
+        self.status = tkinter.StringVar()
+        tkinter.Label(progressGroup, textvariable=self.status, anchor='w').grid(row=1, column=0, sticky='WE')
+
+        self.master = master
+        self.cancel_event = None
+        self.updates = None
+        self.total_files = None
 
     def process_google_voice_directory(self):
-        """This function will write the output to a file
+        """Writes the output to a file in a background thread, so the window keeps responding
         """
         srcpath = self.srcpath.get()
         destpath = self.destpath.get()
 
-        file_count, csv_entries = google_voice_takeout_parser.process_directory(srcpath)
-        google_voice_takeout_parser.write_to_csv(destpath, csv_entries)
-        tkinter.messagebox.showinfo(title='Complete!', message="Your Google Voice HTML parsing is complete!")
+        self.run_button.config(state='disabled')
+        self.cancel_button.config(state='normal')
+        self.progress_bar.config(mode='indeterminate', value=0)
+        self.progress_bar.start()
+        self.status.set("Counting files...")
+        self.total_files = None
+        # The background thread never touches the widgets. It puts its updates in the queue instead,
+        # which _poll applies on the main thread
+        self.cancel_event = threading.Event()
+        self.updates = queue.Queue()
+        threading.Thread(target=self._run, args=(srcpath, destpath, self.cancel_event, self.updates),
+                         daemon=True).start()
+        self.master.after(GUI_POLL_INTERVAL, self._poll)
+
+    def cancel(self):
+        """Stops the run after the file being parsed, and deletes the partial output"""
+        self.cancel_event.set()
+        self.cancel_button.config(state='disabled')
+        self.status.set("Cancelling...")
+
+    @staticmethod
+    def _run(srcpath, destpath, cancel_event, updates):
+        progress = _GuiProgress(cancel_event, updates)
+        try:
+            total_files = 0
+            for _ in google_voice_takeout_parser.iter_html_files(srcpath):
+                if cancel_event.is_set():
+                    raise _RunCancelled()
+                total_files += 1
+            updates.put(('total', total_files))
+            write_directory(srcpath, destpath, progress=progress)
+        except _RunCancelled:
+            if os.path.exists(destpath):
+                os.remove(destpath)
+            updates.put(('cancelled', None))
+        except Exception as E:
+            updates.put(('error', str(E)))
+        else:
+            updates.put(('complete', None))
+        finally:
+            progress.stop()
+
+    def _poll(self):
+        finished = None
+        while finished is None:
+            try:
+                update, value = self.updates.get_nowait()
+            except queue.Empty:
+                break
+            if update == 'total':
+                self.total_files = value
+                self.progress_bar.stop()
+                self.progress_bar.config(mode='determinate', maximum=max(value, 1), value=0)
+            elif update == 'progress':
+                self._show_progress(value)
+            else:
+                finished = update, value
+        if finished is None:
+            self.master.after(GUI_POLL_INTERVAL, self._poll)
+            return
+
+        self.progress_bar.stop()
+        self.run_button.config(state='normal')
+        self.cancel_button.config(state='disabled')
+        update, value = finished
+        if update == 'complete':
+            self.status.set("Complete")
+            tkinter.messagebox.showinfo(title='Complete!', message="Your Google Voice HTML parsing is complete!")
+        elif update == 'cancelled':
+            self.status.set("Cancelled")
+        else:
+            self.status.set("Failed")
+            tkinter.messagebox.showerror(title='Error', message=value)
+
+    def _show_progress(self, totals):
+        self.progress_bar.config(value=totals.files)
+        status = f"{totals.files}/{self.total_files} files, {totals.records_per_second:.0f} records/s"
+        if totals.files_per_second > 0:
+            remaining = max(self.total_files - totals.files, 0) / totals.files_per_second
+            status += f", {datetime.timedelta(seconds=round(remaining))} left"
+        self.status.set(status)
 
 
 if __name__ == "__main__":
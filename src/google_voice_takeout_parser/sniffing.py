@@ -0,0 +1,67 @@
+import collections
+import re
+
+from .google_voice_takeout_parser import DataType
+from .sources import _ArchiveMember
+
+
+# The number of bytes read from the start of a file to sniff it
+SNIFF_SIZE = 8192
+
+# The result of sniff_bytes
+FileSniff = collections.namedtuple('FileSniff', ['file_class', 'data_type'])
+
+_FILE_CLASS_PATTERN = re.compile(rb'<body[^>]*>\s*<div class="([^"]*)"')
+_TITLE_PATTERN = re.compile(rb'<title>(.*?)</title>', re.DOTALL)
+
+# The data type of a call, from the start of its title, as in parse_call
+_CALL_TITLE_DATA_TYPES = [
+    ('Placed call to', DataType.OUTGOING_CALL),
+    ('Received call from', DataType.INCOMING_CALL),
+    ('Missed call from', DataType.MISSED_CALL),
+    ('Voicemail from', DataType.VOICEMAIL),
+    ('Recorded call with', DataType.RECORDED_CALL),
+]
+
+
+def sniff_bytes(data):
+    """Finds the class and data type of a Takeout HTML file from its first few KB, without parsing it.
+
+    Returns a FileSniff. file_class is the class of the body's first <div>, which _parse_tree uses
+    to choose a parser, and data_type is the DataType of the file's records. Either is None if it
+    can't be found in data, such as when data is cut off before the <body>.
+    """
+    match = _FILE_CLASS_PATTERN.search(data)
+    file_class = match.group(1).decode('utf-8', 'replace') if match else None
+    data_type = None
+    if file_class == 'hChatLog hfeed':
+        data_type = DataType.TEXT_MESSAGE
+    elif file_class == 'haudio':
+        match = _TITLE_PATTERN.search(data)
+        title = match.group(1).decode('utf-8', 'replace').lstrip() if match else ''
+        for prefix, call_data_type in _CALL_TITLE_DATA_TYPES:
+            if title.startswith(prefix):
+                data_type = call_data_type
+                break
+    return FileSniff(file_class, data_type)
+
+
+def sniff_file(source, sniff_size=SNIFF_SIZE):
+    """Sniffs the first sniff_size bytes of a file, as for sniff_bytes. source is a path or an _ArchiveMember.
+
+    iter_parsed_files sniffs files with this only when it is given data_types, to skip the files of
+    other data types without parsing them, or when they are large enough to stream. Other files are
+    sniffed from the data read to parse them, so they aren't opened twice.
+    """
+    if isinstance(source, _ArchiveMember):
+        return sniff_bytes(source.data[:sniff_size])
+    with open(source, 'rb') as fh:
+        return sniff_bytes(fh.read(sniff_size))
+
+
+def _sniff_source(source):
+    try:
+        return sniff_file(source)
+    except OSError:
+        # Left to the parser, which reports the error
+        return FileSniff(None, None)
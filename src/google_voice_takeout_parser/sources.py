@@ -0,0 +1,134 @@
+import collections
+import concurrent.futures
+import fnmatch
+import os
+import os.path
+import posixpath
+import zipfile
+
+
+# The folder within a Takeout archive which contains the Google Voice HTML files
+TAKEOUT_CALLS_FOLDER = 'Takeout/Voice/Calls'
+
+# The number of threads reading files ahead of the parser, at most
+READ_AHEAD_THREADS = 8
+
+# An HTML file which has already been read into memory, from a Takeout archive or by _read_ahead
+_ArchiveMember = collections.namedtuple('_ArchiveMember', ['filename', 'data'])
+
+
+def _is_html_file(fname):
+    return fname.lower().endswith('.html')
+
+
+def _matches_globs(relpath, include=None, exclude=None):
+    """Whether a file is selected by the include and exclude globs.
+
+    relpath uses '/' as the separator. A glob matches either the whole relative path or, if the
+    glob has no '/', the file's name. With include globs, the file must match one of them.
+    """
+    fname = posixpath.basename(relpath)
+
+    def matches(pattern):
+        return fnmatch.fnmatchcase(relpath if '/' in pattern else fname, pattern)
+
+    if include and not any(map(matches, include)):
+        return False
+    return not (exclude and any(map(matches, exclude)))
+
+
+def iter_archive_members(zip_fpath, include=None, exclude=None):
+    """Yields the filename and contents of each HTML file in the Voice/Calls folder of a Takeout ZIP archive
+
+    include and exclude are optional lists of globs, matched against the filenames as for iter_html_files.
+    """
+    with zipfile.ZipFile(zip_fpath) as archive:
+        for info in archive.infolist():
+            if info.is_dir() or posixpath.dirname(info.filename) != TAKEOUT_CALLS_FOLDER:
+                continue
+            fname = posixpath.basename(info.filename)
+            if not _is_html_file(fname) or not _matches_globs(fname, include, exclude):
+                continue
+            yield _ArchiveMember(fname, archive.read(info))
+
+
+def iter_html_files(root, recursive=False, include=None, exclude=None):
+    """Yields (filename, path) for each HTML file in the directory root, as it is found.
+
+    The directory is read with os.scandir, so files are yielded without first listing the whole
+    directory. With recursive set, subdirectories are searched too, apart from symbolic links to them.
+    include and exclude are optional lists of globs, such as '*Voicemail*' or 'Spam/*', matched
+    against the path relative to root, or against the filename for globs without a '/'.
+    """
+    # The directories still to be searched, and their paths relative to root
+    directories = [(root, '')]
+    while directories:
+        directory, reldir = directories.pop()
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                relpath = reldir + entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    if recursive and (not exclude or _matches_globs(relpath, exclude=exclude)):
+                        directories.append((entry.path, relpath + '/'))
+                elif _is_html_file(entry.name) and _matches_globs(relpath, include, exclude):
+                    yield entry.name, entry.path
+
+
+def _iter_sources(inputs, recursive=False, include=None, exclude=None):
+    """Yields (filename, source) for each HTML file in the inputs.
+
+    inputs is a directory, a Takeout ZIP archive, or a list of them, such as all of the parts
+    of a split export. source is either the file's path or an _ArchiveMember. The other arguments
+    are as for iter_html_files.
+    """
+    if isinstance(inputs, (str, os.PathLike)):
+        inputs = [inputs]
+    for path in inputs:
+        if os.fspath(path).lower().endswith('.zip'):
+            for member in iter_archive_members(path, include, exclude):
+                yield member.filename, member
+        else:
+            yield from iter_html_files(path, recursive, include, exclude)
+
+
+def _source_size(source):
+    if isinstance(source, _ArchiveMember):
+        return len(source.data)
+    try:
+        return os.path.getsize(source)
+    except OSError:
+        return None
+
+
+def _read_bytes(fpath):
+    with open(fpath, 'rb') as fh:
+        return fh.read()
+
+
+def _prefetched(item, future):
+    if future is None:
+        return item
+    try:
+        return _ArchiveMember(os.path.basename(item), future.result())
+    except OSError:
+        # Parsed from its path instead, so the error is reported like any other
+        return item
+
+
+def _read_ahead(items, depth):
+    """Yields the items, with each file path replaced by an _ArchiveMember holding the file's contents.
+
+    Up to depth files are read by background threads ahead of the item being yielded, so waiting on
+    slow storage overlaps with parsing the earlier files. Other items are yielded unchanged.
+    """
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(depth, READ_AHEAD_THREADS)) as executor:
+        pending = collections.deque()
+        for item in items:
+            if isinstance(item, str):
+                pending.append((item, executor.submit(_read_bytes, item)))
+            else:
+                pending.append((item, None))
+            if len(pending) > depth:
+                yield _prefetched(*pending.popleft())
+        while pending:
+            yield _prefetched(*pending.popleft())
@@ -0,0 +1,113 @@
+import datetime
+import itertools
+import sqlite3
+
+from .google_voice_takeout_parser import convert_timestamp, timestamp_to_datetime
+from .progress import _running
+
+
+# The list fields of each record are stored in their own tables, so that they can be indexed
+SQLITE_SCHEMA = [
+    '''CREATE TABLE records (
+        id INTEGER PRIMARY KEY,
+        data_type TEXT,
+        direction TEXT,
+        duration TEXT,
+        filename TEXT,
+        originating_name TEXT,
+        originating_phone_number TEXT,
+        tags TEXT,
+        timestamp TEXT,
+        timestamp_utc TEXT,
+        user_deleted INTEGER,
+        transcript TEXT,
+        text_message TEXT
+    )''',
+    '''CREATE TABLE recipients (
+        record_id INTEGER REFERENCES records(id),
+        position INTEGER,
+        name TEXT,
+        phone_number TEXT
+    )''',
+    '''CREATE TABLE media_files (
+        record_id INTEGER REFERENCES records(id),
+        position INTEGER,
+        media_type TEXT,
+        path TEXT
+    )''',
+]
+
+# Created after all of the rows are inserted, which is much faster than updating them on every insert
+SQLITE_INDEXES = [
+    'CREATE INDEX records_timestamp_utc ON records(timestamp_utc)',
+    'CREATE INDEX records_originating_phone_number ON records(originating_phone_number)',
+    'CREATE INDEX records_originating_name ON records(originating_name)',
+    'CREATE INDEX records_data_type ON records(data_type)',
+    'CREATE INDEX recipients_record_id ON recipients(record_id)',
+    'CREATE INDEX recipients_phone_number ON recipients(phone_number)',
+    'CREATE INDEX recipients_name ON recipients(name)',
+    'CREATE INDEX media_files_record_id ON media_files(record_id)',
+]
+
+
+def _timestamp_to_utc(timestamp):
+    # Stored in UTC so that timestamps with different UTC offsets sort correctly
+    timestamp = timestamp_to_datetime(timestamp)
+    return timestamp.astimezone(datetime.timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _insert_batch(connection, records, first_id):
+    record_rows = []
+    recipient_rows = []
+    media_file_rows = []
+    for record_id, record in enumerate(records, first_id):
+        record_rows.append((record_id, record['data_type'], record['direction'], record['duration'],
+                            record['filename'], record['originating_name'], record['originating_phone_number'],
+                            record['tags'], convert_timestamp(record['timestamp'], 'str'), _timestamp_to_utc(record['timestamp']),
+                            record['user_deleted'], record['transcript'], record['text_message']))
+        recipients = zip(record['recipient_names'], record['recipient_phone_numbers'])
+        for position, (name, phone_number) in enumerate(recipients):
+            recipient_rows.append((record_id, position, name, phone_number))
+        for position, (media_type, path) in enumerate(record['media_files']):
+            media_file_rows.append((record_id, position, media_type, path))
+
+    with connection:
+        connection.executemany('INSERT INTO records VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', record_rows)
+        connection.executemany('INSERT INTO recipients VALUES (?, ?, ?, ?)', recipient_rows)
+        connection.executemany('INSERT INTO media_files VALUES (?, ?, ?, ?)', media_file_rows)
+
+
+def write_to_sqlite(db_fpath, parsed_files, batch_size=10000, progress=None):
+    """Writes the records to an indexed SQLite database, batch_size at a time, returning the number written.
+
+    Any existing tables in the database are replaced.
+    """
+    record_count = 0
+    with _running(progress):
+        connection = sqlite3.connect(db_fpath)
+        try:
+            # The database is rebuilt from scratch if writing fails, so durability isn't needed
+            connection.execute('PRAGMA synchronous = OFF')
+            connection.execute('PRAGMA journal_mode = MEMORY')
+            with connection:
+                for table in ['media_files', 'recipients', 'records']:
+                    connection.execute(f'DROP TABLE IF EXISTS {table}')
+                for statement in SQLITE_SCHEMA:
+                    connection.execute(statement)
+
+            parsed_files = iter(parsed_files)
+            while True:
+                batch = list(itertools.islice(parsed_files, batch_size))
+                if not batch:
+                    break
+                _insert_batch(connection, batch, record_count + 1)
+                record_count += len(batch)
+                if progress is not None:
+                    progress.add_written(len(batch))
+
+            with connection:
+                for statement in SQLITE_INDEXES:
+                    connection.execute(statement)
+        finally:
+            connection.close()
+    return record_count
@@ -0,0 +1,150 @@
+import html.parser
+import os.path
+import xml.etree.ElementTree
+
+from .google_voice_takeout_parser import (_Conversation, _FastHTMLTreeBuilder, _parse_message, _validate_text_message,
+                                          parse_deleted_status, parse_file, parse_tags)
+
+
+class _MalformedHTML(Exception):
+    """Raised by _StreamingConversationParser for markup it can't build a tree from"""
+
+
+class _StreamingConversationParser(html.parser.HTMLParser):
+    """Tokenizes a conversation file incrementally, only building the subtrees of its <title> and of
+    the <div>s whose class is in captured_classes.
+
+    Each subtree is passed to on_element once it is complete, and is then discarded, so memory use
+    doesn't grow with the size of the file.
+    """
+
+    def __init__(self, on_element, captured_classes):
+        super().__init__(convert_charrefs=True)
+        self.on_element = on_element
+        self.captured_classes = captured_classes
+        self.builder = None
+        self.open_tags = []
+        # The class of the first <div>, which identifies the kind of file
+        self.file_class = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = {k: '' if v is None else v for k, v in attrs}
+        if self.builder is None:
+            if tag == 'div' and self.file_class is None:
+                self.file_class = attrs.get('class', '')
+            if tag != 'title' and not (tag == 'div' and attrs.get('class') in self.captured_classes):
+                return
+            self.builder = xml.etree.ElementTree.TreeBuilder()
+        self.builder.start(tag, attrs)
+        if tag in _FastHTMLTreeBuilder.VOID_ELEMENTS:
+            self.builder.end(tag)
+        else:
+            self.open_tags.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        if self.builder is not None:
+            self.builder.start(tag, {k: '' if v is None else v for k, v in attrs})
+            self.builder.end(tag)
+
+    def handle_endtag(self, tag):
+        if self.builder is None or tag in _FastHTMLTreeBuilder.VOID_ELEMENTS:
+            return
+        if self.open_tags[-1] != tag:
+            raise _MalformedHTML(f"Unexpected closing tag {tag}!")
+        self.open_tags.pop()
+        self.builder.end(tag)
+        if not self.open_tags:
+            element = self.builder.close()
+            self.builder = None
+            self.on_element(element)
+
+    def handle_data(self, data):
+        if self.builder is not None:
+            self.builder.data(data)
+
+
+def _iter_conversation_elements(fpath, captured_classes, chunk_size):
+    """Yields the <title> and captured <div> elements of a conversation file, in order"""
+    elements = []
+    parser = _StreamingConversationParser(elements.append, captured_classes)
+    with open(fpath, encoding='utf-8') as fh:
+        while True:
+            chunk = fh.read(chunk_size)
+            if not chunk:
+                break
+            parser.feed(chunk)
+            if parser.file_class is not None and parser.file_class != 'hChatLog hfeed':
+                raise Exception(f"{os.path.basename(fpath)} is not a conversation file! file_class: {parser.file_class}")
+            yield from elements
+            elements.clear()
+        parser.close()
+    if parser.open_tags:
+        raise _MalformedHTML(f"Unclosed tags: {parser.open_tags}")
+    yield from elements
+
+
+def _wrap_element(element):
+    # parse_tags and parse_deleted_status search below the node they're given
+    root = xml.etree.ElementTree.Element('root')
+    if element is not None:
+        root.append(element)
+    return root
+
+
+def iter_text_file(fpath, chunk_size=65536, timestamp_type='str'):
+    """Parses a conversation (hChatLog hfeed) file incrementally, yielding each message as soon as it is complete.
+
+    This returns the same records as parse_file, but the file's full HTML tree is never built, so memory use
+    stays flat however long the conversation is. The file is read twice: first for the details shared by all of
+    the messages, such as the tags which follow them, and then for the messages themselves. Files with markup
+    which can't be streamed, such as unclosed tags, are parsed with parse_file instead.
+
+    iter_parsed_files uses this for conversation files of at least stream_threshold bytes. They are parsed in
+    the main process as their records are consumed, so the records must be consumed before the next file is
+    requested. These files aren't cached or profiled, and timeout and memory_limit don't apply to them.
+    """
+    filename = os.path.basename(fpath)
+
+    # First pass: collect the details shared by all of the messages
+    conversation = None
+    tags_node = None
+    deleted_status_node = None
+    has_messages = False
+    captured_classes = frozenset(['message', 'participants', 'tags', 'deletedStatusContainer'])
+    try:
+        for element in _iter_conversation_elements(fpath, captured_classes, chunk_size):
+            element_class = element.get('class')
+            if element.tag == 'title':
+                if conversation is None:
+                    conversation = _Conversation(element.text)
+            elif conversation is None:
+                raise Exception("Unable to extract title node!")
+            elif element_class == 'message':
+                has_messages = True
+                if not conversation.is_group_conversation:
+                    conversation.add_sender(_parse_message(element, filename)[1])
+            elif element_class == 'participants':
+                conversation.add_participants(element)
+            elif element_class == 'tags' and tags_node is None:
+                tags_node = element
+            elif element_class == 'deletedStatusContainer' and deleted_status_node is None:
+                deleted_status_node = element
+    except _MalformedHTML:
+        # html5lib repairs markup which the streaming tokenizer can't, such as unclosed tags.
+        # The first pass yields nothing, so the whole file can be parsed instead
+        yield from parse_file(fpath, timestamp_type=timestamp_type)
+        return
+    if not has_messages:
+        return
+    conversation.tags = ','.join(parse_tags(_wrap_element(tags_node)))
+    conversation.user_deleted = parse_deleted_status(_wrap_element(deleted_status_node))
+    conversation.finish_participants()
+
+    # Second pass: parse the messages
+    for element in _iter_conversation_elements(fpath, frozenset(['message']), chunk_size):
+        if element.tag == 'title':
+            continue
+        call_data, _ = _parse_message(element, filename, timestamp_type)
+        conversation.complete(call_data)
+        _validate_text_message(call_data, None, filename)
+        yield call_data
@@ -0,0 +1,14 @@
+import os.path
+import shutil
+
+import pytest
+
+TEST_DATA_DIR = os.path.join("tests", "test_data")
+
+
+@pytest.fixture
+def takeout_with_broken_file(tmp_path):
+    """A takeout directory holding a call and Broken.html, a file with an unsupported file class"""
+    shutil.copy(os.path.join(TEST_DATA_DIR, 'Call - Outgoing.html'), tmp_path)
+    (tmp_path / 'Broken.html').write_text('<html><body><div class="unknown"></div></body></html>')
+    return tmp_path
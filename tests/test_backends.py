@@ -0,0 +1,38 @@
+import os
+import os.path
+
+import html5lib
+import pytest
+
+import google_voice_takeout_parser
+
+TEST_DATA_DIR = os.path.join("tests", "test_data")
+
+
+@pytest.mark.parametrize('test_file', sorted(os.listdir(TEST_DATA_DIR)))
+def test_fast_backend_parity(test_file, monkeypatch) -> None:
+    test_fpath = os.path.join(TEST_DATA_DIR, test_file)
+    expected_result = google_voice_takeout_parser.parse_file(test_fpath, backend='html5lib')
+
+    # Ensure that the fast backend handled the file itself, rather than falling back to html5lib
+    def fail_parse(*args, **kwargs):
+        raise AssertionError("Fell back to html5lib")
+    monkeypatch.setattr(html5lib, 'parse', fail_parse)
+    assert google_voice_takeout_parser.parse_file(test_fpath, backend='fast') == expected_result
+
+
+def test_fast_backend_falls_back_to_html5lib() -> None:
+    test_fpath = os.path.join(TEST_DATA_DIR, 'Call - Outgoing.html')
+    with open(test_fpath, encoding='utf-8') as fh:
+        data = fh.read()
+    # html5lib recovers from a missing closing tag, while the fast backend doesn't
+    data = data.replace('</div></body>', '</body>')
+    with pytest.raises(Exception):
+        google_voice_takeout_parser.parse_html_fast(data)
+    expected_result = google_voice_takeout_parser.parse_str(data, 'Call - Outgoing.html')
+    assert google_voice_takeout_parser.parse_str(data, 'Call - Outgoing.html', backend='fast') == expected_result
+
+
+def test_unknown_backend() -> None:
+    with pytest.raises(Exception, match="Unknown parser backend"):
+        google_voice_takeout_parser.parse_str('', 'empty.html', backend='unknown')
@@ -0,0 +1,56 @@
+import os.path
+
+import pytest
+
+import google_voice_takeout_parser
+
+TEST_DATA_DIR = os.path.join("tests", "test_data")
+
+
+def test_parse_duration() -> None:
+    assert google_voice_takeout_parser.parse_duration('(01:51:35)') == 6695
+    assert google_voice_takeout_parser.parse_duration('(00:00:04)') == 4
+    assert google_voice_takeout_parser.parse_duration('N/A') is None
+
+
+def test_to_dataframe() -> None:
+    pandas = pytest.importorskip('pandas')
+    _, csv_entries = google_voice_takeout_parser.process_directory(TEST_DATA_DIR)
+    df = google_voice_takeout_parser.to_dataframe(google_voice_takeout_parser.iter_directory(TEST_DATA_DIR))
+    assert len(df) == len(csv_entries)
+    assert isinstance(df['data_type'].dtype, pandas.CategoricalDtype)
+    assert isinstance(df['originating_phone_number'].dtype, pandas.CategoricalDtype)
+    assert str(df['timestamp'].dt.tz) == 'UTC'
+
+    voicemail = df[df['filename'] == 'Call - Voicemail.html'].iloc[0]
+    assert voicemail['timestamp'] == pandas.Timestamp('2022-10-24 22:26:52', tz='UTC')
+    assert voicemail['duration'] == 3
+    assert voicemail['media_files'] == [('audio', '+11025550122 - Voicemail - 2022-10-24T22_26_52Z.mp3')]
+    assert df[df['data_type'] == 'MISSED CALL']['duration'].isna().all()
+
+
+def test_write_to_parquet(tmp_path) -> None:
+    pytest.importorskip('pyarrow')
+    import pyarrow.parquet
+    parquet_fpath = str(tmp_path / 'takeout.parquet')
+    _, csv_entries = google_voice_takeout_parser.process_directory(TEST_DATA_DIR)
+    records = google_voice_takeout_parser.iter_directory(TEST_DATA_DIR)
+    assert google_voice_takeout_parser.write_to_parquet(parquet_fpath, records, batch_size=5) == len(csv_entries)
+
+    parquet_file = pyarrow.parquet.ParquetFile(parquet_fpath)
+    assert parquet_file.metadata.num_row_groups == 5
+    table = parquet_file.read()
+    assert table.num_rows == len(csv_entries)
+    assert table.schema.field('data_type').type.value_type == pyarrow.string()
+    assert table.column('timestamp').to_pylist()[0].tzinfo is not None
+    durations = dict(zip(table.column('filename').to_pylist(), table.column('duration').to_pylist()))
+    assert durations['Call - Received with name.html'] == 6695
+    assert durations['Call - Missed with name.html'] is None
+
+
+def test_write_empty_parquet(tmp_path) -> None:
+    pytest.importorskip('pyarrow')
+    import pyarrow.parquet
+    parquet_fpath = str(tmp_path / 'empty.parquet')
+    assert google_voice_takeout_parser.write_to_parquet(parquet_fpath, []) == 0
+    assert pyarrow.parquet.read_table(parquet_fpath).num_rows == 0
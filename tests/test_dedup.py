@@ -0,0 +1,48 @@
+import os.path
+import shutil
+
+import pytest
+
+import google_voice_takeout_parser
+
+TEST_DATA_DIR = os.path.join("tests", "test_data")
+
+
+@pytest.mark.parametrize('on_disk', [False, True])
+def test_merge_overlapping_exports(tmp_path, on_disk) -> None:
+    # Two exports which share some files, one of which was renamed
+    older_export = tmp_path / 'older'
+    newer_export = tmp_path / 'newer'
+    older_export.mkdir()
+    newer_export.mkdir()
+    test_files = sorted(os.listdir(TEST_DATA_DIR))
+    for test_file in test_files[:12]:
+        shutil.copy(os.path.join(TEST_DATA_DIR, test_file), older_export)
+    for test_file in test_files[8:]:
+        shutil.copy(os.path.join(TEST_DATA_DIR, test_file), newer_export / ('Renamed ' + test_file))
+
+    _, expected_result = google_voice_takeout_parser.process_directory(TEST_DATA_DIR)
+    deduplicator = google_voice_takeout_parser.RecordDeduplicator(str(tmp_path / 'keys.db') if on_disk else None)
+    with deduplicator:
+        _, result = google_voice_takeout_parser.process_directory([str(older_export), str(newer_export)],
+                                                                  deduplicator=deduplicator)
+    expected_keys = {google_voice_takeout_parser.record_key(record) for record in expected_result}
+    assert len(result) == len(expected_keys)
+    assert {google_voice_takeout_parser.record_key(record) for record in result} == expected_keys
+    assert deduplicator.duplicates > 0
+
+    if on_disk:
+        # Records seen in an earlier run are skipped
+        with google_voice_takeout_parser.RecordDeduplicator(str(tmp_path / 'keys.db')) as deduplicator:
+            _, result = google_voice_takeout_parser.process_directory(str(newer_export), deduplicator=deduplicator)
+        assert result == []
+
+
+def test_record_key_is_stable() -> None:
+    _, records = google_voice_takeout_parser.process_directory(TEST_DATA_DIR)
+    keys = [google_voice_takeout_parser.record_key(record) for record in records]
+    # The same message was exported in both of these files
+    duplicates = [record['filename'] for record, key in zip(records, keys) if keys.count(key) > 1]
+    assert sorted(duplicates) == ['Text - Emoji embedded.html', 'Text - Video Attachment.html']
+    _, epoch_records = google_voice_takeout_parser.process_directory(TEST_DATA_DIR, timestamp_type='epoch')
+    assert [google_voice_takeout_parser.record_key(record) for record in epoch_records] == keys
@@ -0,0 +1,56 @@
+import json
+import os.path
+import sys
+import time
+
+import pytest
+
+import google_voice_takeout_parser
+from google_voice_takeout_parser.executors import _map_isolated, _Quarantine
+
+TEST_DATA_DIR = os.path.join("tests", "test_data")
+
+
+def test_isolated_matches_serial() -> None:
+    serial_count, serial_entries = google_voice_takeout_parser.process_directory(TEST_DATA_DIR)
+    isolated_count, isolated_entries = google_voice_takeout_parser.process_directory(TEST_DATA_DIR, workers=2,
+                                                                                     timeout=60)
+    assert serial_count == isolated_count == 19
+    assert isolated_entries == serial_entries
+
+
+def test_timeout_quarantines_and_restarts() -> None:
+    start = time.monotonic()
+    results = list(_map_isolated(time.sleep, [0, 60, 0, 0], workers=2, timeout=0.5))
+    assert time.monotonic() - start < 30
+    assert results[0] is None and results[2] is None and results[3] is None
+    assert results[1] == (None, _Quarantine("Timed out after 0.5 seconds"), None)
+
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason="memory_limit is only supported on Linux")
+def test_memory_limit_quarantines() -> None:
+    results = list(_map_isolated(bytearray, [16, 2**34, 16], memory_limit=256 * 2**20))
+    assert results[0] == results[2] == bytearray(16)
+    _, error, _ = results[1]
+    assert isinstance(error, _Quarantine)
+    assert error.reason.startswith("The worker process exited with code")
+
+
+def test_error_report(takeout_with_broken_file, capsys) -> None:
+    error_report = google_voice_takeout_parser.ErrorReport()
+    file_count, csv_entries = google_voice_takeout_parser.process_directory(str(takeout_with_broken_file),
+                                                                            timeout=60, error_report=error_report)
+    assert file_count == 2
+    assert len(csv_entries) == 1
+    assert "Exception when processing file" not in capsys.readouterr().out
+    [error] = error_report.errors
+    assert error['filename'] == 'Broken.html'
+    assert error['path'] == str(takeout_with_broken_file / 'Broken.html')
+    assert error['reason'].startswith("Unknown file_class unknown")
+    assert error_report.quarantined == []
+
+    error_report.add_quarantined('Slow.html', None, "Timed out after 1 seconds")
+    report_fpath = takeout_with_broken_file / 'errors.json'
+    error_report.write(report_fpath)
+    with open(report_fpath, encoding='utf-8') as fh:
+        assert json.load(fh) == error_report.to_dict()
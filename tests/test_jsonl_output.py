@@ -0,0 +1,39 @@
+import json
+import os.path
+
+import pytest
+
+import google_voice_takeout_parser
+
+TEST_DATA_DIR = os.path.join("tests", "test_data")
+
+
+@pytest.mark.parametrize('use_orjson', [False, True])
+def test_write_to_jsonl(tmp_path, use_orjson) -> None:
+    if use_orjson:
+        pytest.importorskip('orjson')
+    _, csv_entries = google_voice_takeout_parser.process_directory(TEST_DATA_DIR)
+    jsonl_fpath = tmp_path / 'out.jsonl'
+    record_count = google_voice_takeout_parser.write_to_jsonl(jsonl_fpath, iter(csv_entries), use_orjson=use_orjson)
+    assert record_count == len(csv_entries)
+
+    with open(jsonl_fpath, encoding='utf-8') as fh:
+        rows = [json.loads(line) for line in fh]
+    assert len(rows) == len(csv_entries)
+    for row, record in zip(rows, csv_entries):
+        assert row['recipient_names'] == record['recipient_names']
+        assert row['recipient_phone_numbers'] == record['recipient_phone_numbers']
+        assert row['media_files'] == [{'media_type': media_type, 'path': path}
+                                      for media_type, path in record['media_files']]
+        assert {key: value for key, value in row.items() if key != 'media_files'} == \
+            {key: value for key, value in dict(record).items() if key != 'media_files'}
+
+
+def test_write_to_jsonl_serializers_match(tmp_path) -> None:
+    pytest.importorskip('orjson')
+    _, csv_entries = google_voice_takeout_parser.process_directory(TEST_DATA_DIR, timestamp_type='datetime')
+    google_voice_takeout_parser.write_to_jsonl(tmp_path / 'json.jsonl', csv_entries, use_orjson=False)
+    google_voice_takeout_parser.write_to_jsonl(tmp_path / 'orjson.jsonl', csv_entries, use_orjson=True)
+    assert (tmp_path / 'json.jsonl').read_bytes() == (tmp_path / 'orjson.jsonl').read_bytes()
+    assert json.loads((tmp_path / 'json.jsonl').read_text(encoding='utf-8').splitlines()[0])['timestamp'] == \
+        csv_entries[0]['timestamp'].isoformat()
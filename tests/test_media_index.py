@@ -0,0 +1,76 @@
+import os
+import os.path
+import shutil
+
+import google_voice_takeout_parser
+
+TEST_DATA_DIR = os.path.join("tests", "test_data")
+
+IMAGE_STEMS = ['Joe Smith - Cell - Text - 2022-03-23T18_17_22Z-1-1', 'Joe Smith - Cell - Text - 2022-03-23T18_17_22Z-1-2']
+
+
+def _make_takeout(tmp_path):
+    indir = tmp_path / 'takeout'
+    shutil.copytree(TEST_DATA_DIR, indir)
+    for stem in IMAGE_STEMS:
+        (indir / (stem + '.jpg')).write_bytes(b'\xff\xd8')
+    (indir / '+11025550122 - Voicemail - 2022-10-24T22_26_52Z.mp3').write_bytes(b'ID3')
+    return indir
+
+
+def test_media_index_resolves_references(tmp_path) -> None:
+    indir = _make_takeout(tmp_path)
+    index = google_voice_takeout_parser.MediaIndex.from_inputs(str(indir))
+    assert index.resolve(IMAGE_STEMS[0]) == str(indir / (IMAGE_STEMS[0] + '.jpg'))
+    assert index.resolve(IMAGE_STEMS[0] + '.jpg') == str(indir / (IMAGE_STEMS[0] + '.jpg'))
+    assert index.resolve('Text - Name with images') is None
+
+    _, records = google_voice_takeout_parser.process_directory(str(indir), media_index=index)
+    media_files = {media_file for record in records for media_file in record['media_files']}
+    assert ('image', str(indir / (IMAGE_STEMS[1] + '.jpg'))) in media_files
+    assert ('audio', str(indir / '+11025550122 - Voicemail - 2022-10-24T22_26_52Z.mp3')) in media_files
+    # Files which aren't in the takeout are left as they were
+    assert ('video', 'Joe Smith - Text - 2023-12-20T18_49_36Z-1-1') in media_files
+
+
+def test_media_index_exports_files(tmp_path) -> None:
+    indir = _make_takeout(tmp_path)
+    for mode in google_voice_takeout_parser.MEDIA_EXPORT_MODES:
+        export_dir = tmp_path / f"out_{mode}"
+        index = google_voice_takeout_parser.MediaIndex.from_inputs(str(indir), export_dir=str(export_dir), mode=mode)
+        _, records = google_voice_takeout_parser.process_directory(str(indir), media_index=index)
+        assert sorted(os.listdir(export_dir)) == sorted(['+11025550122 - Voicemail - 2022-10-24T22_26_52Z.mp3'] +
+                                                        [stem + '.jpg' for stem in IMAGE_STEMS])
+        assert ('image', str(export_dir / (IMAGE_STEMS[0] + '.jpg'))) in \
+            [media_file for record in records for media_file in record['media_files']]
+    assert os.path.samefile(tmp_path / 'out_hardlink' / (IMAGE_STEMS[0] + '.jpg'), indir / (IMAGE_STEMS[0] + '.jpg'))
+
+
+def test_media_index_exports_files_with_the_same_name(tmp_path) -> None:
+    first_dir = tmp_path / 'first'
+    second_dir = tmp_path / 'second'
+    for directory, contents in [(first_dir, b'first'), (second_dir, b'second')]:
+        directory.mkdir()
+        (directory / 'photo.jpg').write_bytes(contents)
+    export_dir = tmp_path / 'out'
+    # A file with the same name left by another run
+    export_dir.mkdir()
+    (export_dir / 'photo.jpg').write_bytes(b'other')
+
+    index = google_voice_takeout_parser.MediaIndex.from_inputs([str(first_dir), str(second_dir)],
+                                                               export_dir=str(export_dir))
+    # The stem resolves to the first file, and the name to the second
+    first_export = index._resolve_file('photo')
+    second_export = index._resolve_file('photo.jpg')
+    assert first_export != second_export
+    assert (export_dir / os.path.basename(first_export)).read_bytes() == b'first'
+    assert (export_dir / os.path.basename(second_export)).read_bytes() == b'second'
+    assert (export_dir / 'photo.jpg').read_bytes() == b'other'
+    assert index._resolve_file('photo') == first_export
+
+    # A later run reuses its own exports
+    index = google_voice_takeout_parser.MediaIndex.from_inputs([str(first_dir), str(second_dir)],
+                                                               export_dir=str(export_dir))
+    assert index._resolve_file('photo') == first_export
+    assert index._resolve_file('photo.jpg') == second_export
+    assert len(os.listdir(export_dir)) == 3
@@ -0,0 +1,94 @@
+import os
+import os.path
+import shutil
+
+import pytest
+
+import google_voice_takeout_parser
+from google_voice_takeout_parser import parse_cache
+
+TEST_DATA_DIR = os.path.join("tests", "test_data")
+
+
+def fail_parse(*args, **kwargs):
+    raise AssertionError("File should have been served from the cache")
+
+
+def test_cache_skips_unchanged_files(tmp_path, monkeypatch) -> None:
+    cache_fpath = str(tmp_path / 'cache.sqlite')
+    with google_voice_takeout_parser.ParseCache(cache_fpath) as cache:
+        expected_result = google_voice_takeout_parser.process_directory(TEST_DATA_DIR, cache=cache)
+
+    monkeypatch.setattr(google_voice_takeout_parser.pipeline, 'parse_str', fail_parse)
+    with google_voice_takeout_parser.ParseCache(cache_fpath) as cache:
+        assert google_voice_takeout_parser.process_directory(TEST_DATA_DIR, cache=cache) == expected_result
+
+
+def test_cache_reparses_changed_files(tmp_path) -> None:
+    indir = tmp_path / 'takeout'
+    shutil.copytree(TEST_DATA_DIR, indir)
+    cache_fpath = str(tmp_path / 'cache.sqlite')
+    with google_voice_takeout_parser.ParseCache(cache_fpath) as cache:
+        google_voice_takeout_parser.process_directory(str(indir), cache=cache)
+
+    test_fpath = indir / 'Text - Incoming, no name, no response.html'
+    test_fpath.write_text(test_fpath.read_text(encoding='utf-8').replace('Hello', 'Goodbye'), encoding='utf-8')
+    with google_voice_takeout_parser.ParseCache(cache_fpath) as cache:
+        _, csv_entries = google_voice_takeout_parser.process_directory(str(indir), cache=cache)
+    assert 'Goodbye' in [entry['text_message'] for entry in csv_entries]
+
+
+def test_cache_hash_contents(tmp_path) -> None:
+    test_fpath = tmp_path / 'Call - Outgoing.html'
+    shutil.copy(os.path.join(TEST_DATA_DIR, 'Call - Outgoing.html'), test_fpath)
+    cache_fpath = str(tmp_path / 'cache.sqlite')
+    with google_voice_takeout_parser.ParseCache(cache_fpath, hash_contents=True) as cache:
+        key, records = cache.lookup(test_fpath)
+        assert records is None
+        cache.store(key, google_voice_takeout_parser.parse_file(test_fpath))
+
+    stat_result = os.stat(test_fpath)
+    os.utime(test_fpath, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns + 10**9))
+    with google_voice_takeout_parser.ParseCache(cache_fpath, hash_contents=True) as cache:
+        assert cache.lookup(test_fpath)[1] == google_voice_takeout_parser.parse_file(test_fpath)
+    with google_voice_takeout_parser.ParseCache(cache_fpath) as cache:
+        assert cache.lookup(test_fpath)[1] is not None
+
+
+@pytest.mark.parametrize('hash_contents', [False, True])
+def test_cache_invalidated_by_version(tmp_path, monkeypatch, hash_contents) -> None:
+    test_fpath = os.path.join(TEST_DATA_DIR, 'Call - Outgoing.html')
+    cache_fpath = str(tmp_path / 'cache.sqlite')
+    with google_voice_takeout_parser.ParseCache(cache_fpath, hash_contents=hash_contents) as cache:
+        key, _ = cache.lookup(test_fpath)
+        cache.store(key, google_voice_takeout_parser.parse_file(test_fpath))
+
+    monkeypatch.setattr(parse_cache, '__version__', '999.0')
+    with google_voice_takeout_parser.ParseCache(cache_fpath, hash_contents=hash_contents) as cache:
+        assert cache.lookup(test_fpath)[1] is None
+
+
+def test_cache_invalidated_by_format(tmp_path, monkeypatch) -> None:
+    test_fpath = os.path.join(TEST_DATA_DIR, 'Call - Outgoing.html')
+    cache_fpath = str(tmp_path / 'cache.sqlite')
+    with google_voice_takeout_parser.ParseCache(cache_fpath) as cache:
+        key, _ = cache.lookup(test_fpath)
+        cache.store(key, google_voice_takeout_parser.parse_file(test_fpath))
+
+    monkeypatch.setattr(parse_cache, 'CACHE_FORMAT', '999')
+    with google_voice_takeout_parser.ParseCache(cache_fpath) as cache:
+        assert cache.lookup(test_fpath)[1] is None
+
+
+def test_cache_entries_of_the_wrong_type_are_misses(tmp_path) -> None:
+    test_fpath = os.path.join(TEST_DATA_DIR, 'Call - Outgoing.html')
+    cache_fpath = str(tmp_path / 'cache.sqlite')
+    with google_voice_takeout_parser.ParseCache(cache_fpath) as cache:
+        key, _ = cache.lookup(test_fpath)
+        # Such as the dicts stored by older versions
+        cache.store(key, [dict(record) for record in google_voice_takeout_parser.parse_file(test_fpath)])
+        assert cache.lookup(test_fpath)[1] is None
+        cache.connection.execute("UPDATE files SET records = ?", (b'not a pickle',))
+        assert cache.lookup(test_fpath)[1] is None
+        result = google_voice_takeout_parser.process_directory(TEST_DATA_DIR, cache=cache)
+    assert result == google_voice_takeout_parser.process_directory(TEST_DATA_DIR)
@@ -0,0 +1,146 @@
+import os.path
+import shutil
+import subprocess
+import sys
+import warnings
+import zipfile
+
+import pytest
+
+import google_voice_takeout_parser
+
+TEST_DATA_DIR = os.path.join("tests", "test_data")
+
+
+def test_parallel_matches_serial() -> None:
+    serial_count, serial_entries = google_voice_takeout_parser.process_directory(TEST_DATA_DIR)
+    parallel_count, parallel_entries = google_voice_takeout_parser.process_directory(TEST_DATA_DIR, workers=2)
+    assert serial_count == parallel_count == 19
+    assert parallel_entries == serial_entries
+
+
+def test_parallel_reports_exceptions(takeout_with_broken_file, capsys) -> None:
+    file_count, csv_entries = google_voice_takeout_parser.process_directory(str(takeout_with_broken_file), workers=2)
+    assert file_count == 2
+    assert len(csv_entries) == 1
+    assert "Exception when processing file Broken.html: Unknown file_class unknown" in capsys.readouterr().out
+
+
+def test_iter_directory_matches_process_directory() -> None:
+    _, csv_entries = google_voice_takeout_parser.process_directory(TEST_DATA_DIR)
+    records = google_voice_takeout_parser.iter_directory(TEST_DATA_DIR)
+    assert not isinstance(records, list)
+    assert list(records) == csv_entries
+
+
+def test_write_to_csv_streams_records(tmp_path) -> None:
+    _, csv_entries = google_voice_takeout_parser.process_directory(TEST_DATA_DIR)
+    list_fpath = tmp_path / 'list.csv'
+    stream_fpath = tmp_path / 'stream.csv'
+    google_voice_takeout_parser.write_to_csv(list_fpath, csv_entries)
+    record_count = google_voice_takeout_parser.write_to_csv(stream_fpath,
+                                                            google_voice_takeout_parser.iter_directory(TEST_DATA_DIR))
+    assert record_count == len(csv_entries)
+    assert stream_fpath.read_text(encoding='utf-8') == list_fpath.read_text(encoding='utf-8')
+
+
+def write_takeout_archive(zip_fpath, fnames) -> None:
+    with zipfile.ZipFile(zip_fpath, 'w') as archive:
+        archive.writestr('Takeout/archive_browser.html', '<html></html>')
+        archive.writestr('Takeout/Voice/Phones.vcf', '')
+        for f in fnames:
+            archive.write(os.path.join(TEST_DATA_DIR, f), 'Takeout/Voice/Calls/' + f)
+
+
+def test_process_zip_archive(tmp_path) -> None:
+    expected_result = google_voice_takeout_parser.process_directory(TEST_DATA_DIR)
+    zip_fpath = str(tmp_path / 'takeout-001.zip')
+    write_takeout_archive(zip_fpath, os.listdir(TEST_DATA_DIR))
+    assert google_voice_takeout_parser.process_directory(zip_fpath) == expected_result
+    assert google_voice_takeout_parser.process_directory(zip_fpath, workers=2) == expected_result
+
+
+def test_process_split_zip_archives(tmp_path) -> None:
+    expected_result = google_voice_takeout_parser.process_directory(TEST_DATA_DIR)
+    fnames = os.listdir(TEST_DATA_DIR)
+    zip_fpaths = [str(tmp_path / 'takeout-001.zip'), str(tmp_path / 'takeout-002.zip')]
+    write_takeout_archive(zip_fpaths[0], fnames[:10])
+    write_takeout_archive(zip_fpaths[1], fnames[10:])
+    assert google_voice_takeout_parser.process_directory(zip_fpaths) == expected_result
+
+
+def test_read_ahead_matches_serial(tmp_path, capsys) -> None:
+    serial_result = google_voice_takeout_parser.process_directory(TEST_DATA_DIR)
+    assert google_voice_takeout_parser.process_directory(TEST_DATA_DIR, read_ahead=4) == serial_result
+    assert google_voice_takeout_parser.process_directory(TEST_DATA_DIR, workers=2, read_ahead=1) == serial_result
+
+    # A file which can't be read is reported as usual
+    shutil.copy(os.path.join(TEST_DATA_DIR, 'Call - Outgoing.html'), tmp_path)
+    (tmp_path / 'Unreadable.html').symlink_to(tmp_path / 'Missing.html')
+    file_count, csv_entries = google_voice_takeout_parser.process_directory(str(tmp_path), read_ahead=4)
+    assert file_count == 2
+    assert len(csv_entries) == 1
+    assert "Exception when processing file Unreadable.html" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize('hash_contents', [False, True])
+def test_cache_reports_unreadable_files(tmp_path, capsys, hash_contents) -> None:
+    indir = tmp_path / 'takeout'
+    indir.mkdir()
+    shutil.copy(os.path.join(TEST_DATA_DIR, 'Call - Outgoing.html'), indir)
+    (indir / 'Unreadable.html').symlink_to(indir / 'Missing.html')
+    with google_voice_takeout_parser.ParseCache(str(tmp_path / 'cache.sqlite'), hash_contents=hash_contents) as cache:
+        file_count, csv_entries = google_voice_takeout_parser.process_directory(str(indir), cache=cache,
+                                                                                read_ahead=4)
+    assert file_count == 2
+    assert len(csv_entries) == 1
+    assert "Exception when processing file Unreadable.html" in capsys.readouterr().out
+
+
+def test_iter_html_files(tmp_path) -> None:
+    for relpath in ['a.html', 'b.HTML', 'foohtml', 'Phones.vcf', 'sub/c.html', 'sub/deeper/d.html', 'Spam/e.html']:
+        (tmp_path / relpath).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / relpath).write_text('')
+
+    def found(**kwargs):
+        return sorted(os.path.relpath(path, tmp_path).replace(os.sep, '/')
+                      for _, path in google_voice_takeout_parser.iter_html_files(str(tmp_path), **kwargs))
+
+    assert found() == ['a.html', 'b.HTML']
+    assert found(recursive=True) == ['Spam/e.html', 'a.html', 'b.HTML', 'sub/c.html', 'sub/deeper/d.html']
+    assert found(recursive=True, exclude=['Spam', '*.HTML']) == ['a.html', 'sub/c.html', 'sub/deeper/d.html']
+    assert found(recursive=True, include=['sub/*']) == ['sub/c.html', 'sub/deeper/d.html']
+    assert found(recursive=True, include=['[cd].html'], exclude=['sub/deeper/*']) == ['sub/c.html']
+
+
+def test_process_multiple_roots_recursively(tmp_path) -> None:
+    for index, test_file in enumerate(sorted(os.listdir(TEST_DATA_DIR))):
+        subdir = tmp_path / f"takeout{index % 2}" / ('texts' if test_file.startswith('Text') else 'calls')
+        subdir.mkdir(parents=True, exist_ok=True)
+        shutil.copy(os.path.join(TEST_DATA_DIR, test_file), subdir)
+    _, expected_entries = google_voice_takeout_parser.process_directory(TEST_DATA_DIR)
+    file_count, csv_entries = google_voice_takeout_parser.process_directory(
+        [str(tmp_path / 'takeout0'), str(tmp_path / 'takeout1')], recursive=True)
+    assert file_count == 19
+    assert sorted(map(repr, csv_entries)) == sorted(map(repr, expected_entries))
+    file_count, _ = google_voice_takeout_parser.process_directory(str(tmp_path), recursive=True, exclude=['calls'])
+    assert file_count == 11
+
+
+def test_workers_are_not_forked() -> None:
+    # Forking while the read ahead threads run can deadlock, and warns from Python 3.12 on
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always', DeprecationWarning)
+        serial_result = google_voice_takeout_parser.process_directory(TEST_DATA_DIR)
+        assert google_voice_takeout_parser.process_directory(TEST_DATA_DIR, workers=2, read_ahead=4) == serial_result
+        assert google_voice_takeout_parser.process_directory(TEST_DATA_DIR, timeout=10, read_ahead=4) == serial_result
+    assert not [warning for warning in caught if 'fork' in str(warning.message)]
+
+    script = ("import google_voice_takeout_parser\n"
+              "if __name__ == '__main__':\n"
+              f"    google_voice_takeout_parser.process_directory({TEST_DATA_DIR!r}, workers=2, read_ahead=4)\n"
+              f"    google_voice_takeout_parser.process_directory({TEST_DATA_DIR!r}, timeout=10, read_ahead=4)\n")
+    completed = subprocess.run([sys.executable, '-W', 'error::DeprecationWarning', '-c', script],
+                               capture_output=True, text=True)
+    assert completed.returncode == 0, completed.stderr
+    assert 'fork' not in completed.stderr
@@ -0,0 +1,35 @@
+import os.path
+
+import google_voice_takeout_parser
+
+TEST_DATA_DIR = os.path.join("tests", "test_data")
+
+
+def test_parse_file_stats() -> None:
+    stats = {}
+    test_fpath = os.path.join(TEST_DATA_DIR, 'Call - Voicemail.html')
+    google_voice_takeout_parser.parse_file(test_fpath, stats=stats)
+    assert stats['file_class'] == 'haudio'
+    assert stats['bytes'] == os.path.getsize(test_fpath)
+    for key in ['read_seconds', 'tree_seconds', 'extract_seconds']:
+        assert stats[key] >= 0
+
+
+def test_profiler_report(tmp_path) -> None:
+    profiler = google_voice_takeout_parser.ParseProfiler()
+    _, csv_entries = google_voice_takeout_parser.process_directory(TEST_DATA_DIR, workers=2, profiler=profiler)
+    records = google_voice_takeout_parser.iter_directory(TEST_DATA_DIR)
+    record_count = profiler.profile_write(google_voice_takeout_parser.write_to_csv, str(tmp_path / 'out.csv'), records)
+    assert record_count == len(csv_entries)
+
+    assert len(profiler.files) == 19
+    assert profiler.stages['haudio']['tree'].count == 8
+    assert profiler.stages['hChatLog hfeed']['extract'].count == 11
+    assert profiler.stages['output']['write'].bytes == os.path.getsize(tmp_path / 'out.csv')
+
+    report = profiler.report(top_n=2)
+    assert 'Slowest 2 files:' in report
+    assert 'Largest 2 files:' in report
+    # The largest file is listed first
+    largest_file = max(os.listdir(TEST_DATA_DIR), key=lambda f: os.path.getsize(os.path.join(TEST_DATA_DIR, f)))
+    assert report.split('Largest 2 files:\n')[1].splitlines()[0].endswith(largest_file)
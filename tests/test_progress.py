@@ -0,0 +1,114 @@
+import os.path
+import time
+
+import pytest
+
+import google_voice_takeout_parser
+
+TEST_DATA_DIR = os.path.join("tests", "test_data")
+
+
+class RecordingObserver(google_voice_takeout_parser.ProgressObserver):
+    def __init__(self, interval=0):
+        super().__init__(interval)
+        self.events = []
+        self.updates = []
+
+    def file_done(self, event):
+        self.events.append(event)
+
+    def update(self, totals):
+        self.updates.append(totals)
+
+
+def test_file_events() -> None:
+    progress = RecordingObserver()
+    file_count, csv_entries = google_voice_takeout_parser.process_directory(TEST_DATA_DIR, progress=progress)
+    assert len(progress.events) == file_count == 19
+    assert sum(event.records for event in progress.events) == len(csv_entries)
+    for event in progress.events:
+        assert event.path == os.path.join(TEST_DATA_DIR, event.filename)
+        assert event.bytes == os.path.getsize(event.path)
+        assert 0 < event.elapsed < 10
+        assert event.error is None
+    totals = progress.updates[-1]
+    assert totals.files == 19
+    assert totals.records == len(csv_entries)
+    assert totals.bytes == sum(event.bytes for event in progress.events)
+    assert totals.errors == 0
+
+
+def test_error_events(takeout_with_broken_file, capsys) -> None:
+    progress = RecordingObserver()
+    google_voice_takeout_parser.process_directory(str(takeout_with_broken_file), workers=2, progress=progress)
+    events = {event.filename: event for event in progress.events}
+    assert events['Call - Outgoing.html'].records == 1
+    assert events['Call - Outgoing.html'].error is None
+    assert events['Broken.html'].records == 0
+    assert events['Broken.html'].error.startswith("Unknown file_class unknown")
+    assert progress.updates[-1].errors == 1
+
+
+def test_streamed_records_are_counted() -> None:
+    progress = RecordingObserver()
+    records = list(google_voice_takeout_parser.iter_directory(TEST_DATA_DIR, stream_threshold=0, progress=progress))
+    assert sum(event.records for event in progress.events) == len(records)
+
+
+@pytest.mark.parametrize('write_func', [
+    google_voice_takeout_parser.write_to_csv,
+    google_voice_takeout_parser.write_to_sqlite,
+    google_voice_takeout_parser.write_to_parquet,
+    google_voice_takeout_parser.write_to_jsonl,
+])
+def test_writers_report_records_written(tmp_path, write_func) -> None:
+    if write_func is google_voice_takeout_parser.write_to_parquet:
+        pytest.importorskip('pyarrow')
+    progress = RecordingObserver()
+    records = google_voice_takeout_parser.iter_directory(TEST_DATA_DIR, progress=progress)
+    record_count = write_func(str(tmp_path / 'out'), records, progress=progress)
+    # One final update, once writing is finished rather than when parsing is
+    assert len(progress.updates) == 20
+    totals = progress.updates[-1]
+    assert totals.records_written == totals.records == record_count
+
+
+def test_updates_are_throttled() -> None:
+    progress = RecordingObserver(interval=3600)
+    google_voice_takeout_parser.process_directory(TEST_DATA_DIR, progress=progress)
+    # Only the final update, when parsing is finished
+    assert len(progress.updates) == 1
+    assert len(progress.events) == 19
+
+
+def test_elapsed_is_the_parse_time(tmp_path) -> None:
+    with google_voice_takeout_parser.ParseCache(str(tmp_path / 'cache.db')) as cache:
+        google_voice_takeout_parser.process_directory(TEST_DATA_DIR, cache=cache)
+        progress = RecordingObserver()
+        google_voice_takeout_parser.process_directory(TEST_DATA_DIR, workers=2, cache=cache, progress=progress)
+    # Files served from the cache weren't parsed
+    assert [event.elapsed for event in progress.events] == [None] * 19
+
+    progress = RecordingObserver()
+    google_voice_takeout_parser.process_directory(TEST_DATA_DIR, stream_threshold=0, progress=progress)
+    assert all(event.elapsed > 0 for event in progress.events)
+
+
+def test_updates_continue_during_a_stall() -> None:
+    progress = RecordingObserver(interval=0.05)
+    for _ in google_voice_takeout_parser.iter_parsed_files(TEST_DATA_DIR, progress=progress):
+        # Such as a file which takes a long time to parse
+        time.sleep(0.5)
+        break
+    assert len(progress.updates) >= 3
+    assert {totals.files for totals in progress.updates} == {0}
+
+
+def test_timer_stops_when_the_run_is_abandoned() -> None:
+    progress = RecordingObserver(interval=0.05)
+    parsed_files = google_voice_takeout_parser.iter_parsed_files(TEST_DATA_DIR, progress=progress)
+    next(parsed_files)
+    assert progress._timer.is_alive()
+    parsed_files.close()
+    progress._timer.join(1)
+    assert not progress._timer.is_alive()
@@ -0,0 +1,93 @@
+import json
+import os.path
+import pickle
+
+import pytest
+
+import google_voice_takeout_parser
+
+TEST_DATA_DIR = os.path.join("tests", "test_data")
+
+
+def test_record_mapping_view() -> None:
+    test_fpath = os.path.join(TEST_DATA_DIR, 'Call - Voicemail.html')
+    record = google_voice_takeout_parser.parse_file(test_fpath)[0]
+    assert isinstance(record, google_voice_takeout_parser.Record)
+    assert not hasattr(record, '__dict__')
+
+    # The attributes hold the compact values
+    assert record.data_type is google_voice_takeout_parser.DataType.VOICEMAIL
+    assert record.direction is google_voice_takeout_parser.Direction.INCOMING
+    assert record.media_files == (('audio', '+11025550122 - Voicemail - 2022-10-24T22_26_52Z.mp3'),)
+
+    # While the mapping view returns plain strings and lists
+    assert record['data_type'] == 'VOICEMAIL'
+    assert type(record['data_type']) is str
+    assert record['media_files'] == [('audio', '+11025550122 - Voicemail - 2022-10-24T22_26_52Z.mp3')]
+    assert list(record) == list(google_voice_takeout_parser.create_dict_parsed_data())
+    assert dict(record) == record
+    assert pickle.loads(pickle.dumps(record)) == record
+
+
+def test_record_is_mutable() -> None:
+    test_fpath = os.path.join(TEST_DATA_DIR, 'Call - Voicemail.html')
+    record = google_voice_takeout_parser.parse_file(test_fpath)[0]
+    record['tags'] = 'Archived'
+    record['data_type'] = 'RECORDED CALL'
+    record.update(recipient_names=['Joe Smith'], media_files=[['audio', 'voicemail.mp3']])
+    assert record.data_type is google_voice_takeout_parser.DataType.RECORDED_CALL
+    assert record.recipient_names == ('Joe Smith',)
+    assert record['media_files'] == [('audio', 'voicemail.mp3')]
+    assert record['tags'] == 'Archived'
+    with pytest.raises(KeyError):
+        record['unknown'] = ''
+    with pytest.raises(TypeError):
+        del record['tags']
+
+    # to_dict returns a plain dict, which is JSON serializable unlike the record
+    data = record.to_dict()
+    assert type(data) is dict
+    assert data == record
+    assert json.loads(json.dumps(data))['recipient_names'] == ['Joe Smith']
+    with pytest.raises(TypeError):
+        json.dumps(record)
+
+
+def test_recipients_shared_between_messages() -> None:
+    test_fpath = os.path.join(TEST_DATA_DIR, 'Text - Name with images.html')
+    records = google_voice_takeout_parser.parse_file(test_fpath)
+    assert len(records) == 2
+    for record in records:
+        assert record.recipient_names is google_voice_takeout_parser.GOOGLE_VOICE_SUBJECT_NAMES
+        assert record.recipient_phone_numbers is google_voice_takeout_parser.GOOGLE_VOICE_SUBJECT_NUMBERS
+
+
+def test_csv_matches_dicts(tmp_path) -> None:
+    _, csv_entries = google_voice_takeout_parser.process_directory(TEST_DATA_DIR)
+    google_voice_takeout_parser.write_to_csv(tmp_path / 'records.csv', csv_entries)
+    google_voice_takeout_parser.write_to_csv(tmp_path / 'dicts.csv', [dict(entry) for entry in csv_entries])
+    records_csv = (tmp_path / 'records.csv').read_text(encoding='utf-8')
+    assert records_csv == (tmp_path / 'dicts.csv').read_text(encoding='utf-8')
+    assert "['Google Voice Takeout Subject']" in records_csv
+    assert 'DataType' not in records_csv
+
+
+def test_contacts_shared_between_files() -> None:
+    _, records = google_voice_takeout_parser.process_directory(TEST_DATA_DIR, workers=2)
+    joe_smith_records = [record for record in records if record.originating_name == 'Joe Smith']
+    assert len(joe_smith_records) > 1
+    # Each file is parsed in its own worker process, but the records share their contacts again
+    for record in joe_smith_records:
+        assert record.originating_name is joe_smith_records[0].originating_name
+    for record in records:
+        if record.recipient_names == google_voice_takeout_parser.GOOGLE_VOICE_SUBJECT_NAMES:
+            assert record.recipient_names is google_voice_takeout_parser.GOOGLE_VOICE_SUBJECT_NAMES
+
+
+def test_contact_table() -> None:
+    contacts = google_voice_takeout_parser.ContactTable()
+    names = ('Joe Smith', ''.join(['Bob', ' Smith']))
+    shared_names = contacts.intern_tuple(names)
+    assert shared_names == names
+    assert contacts.intern_tuple(tuple(list(names))) is shared_names
+    assert contacts.intern('Bob' + ' Smith') is shared_names[1]
@@ -0,0 +1,51 @@
+import datetime
+import os.path
+import shutil
+
+import google_voice_takeout_parser
+
+TEST_DATA_DIR = os.path.join("tests", "test_data")
+
+
+def test_parse_filename() -> None:
+    metadata = google_voice_takeout_parser.parse_filename('Joe Smith - Cell - Voicemail - 2022-10-24T22_26_52Z.html')
+    assert metadata == ('Joe Smith - Cell', google_voice_takeout_parser.DataType.VOICEMAIL,
+                        datetime.datetime(2022, 10, 24, 22, 26, 52, tzinfo=datetime.timezone.utc))
+    metadata = google_voice_takeout_parser.parse_filename('Group Conversation - 2021-04-20T19_42_39Z.html')
+    assert metadata.data_type == google_voice_takeout_parser.DataType.TEXT_MESSAGE
+    assert google_voice_takeout_parser.parse_filename('Call - Voicemail.html') is None
+
+
+def test_record_filter_matches_records() -> None:
+    _, records = google_voice_takeout_parser.process_directory(TEST_DATA_DIR)
+    record_filter = google_voice_takeout_parser.RecordFilter(since='2023-01-01 00:00:00 +0000',
+                                                             until='2024-01-01 00:00:00 +0000',
+                                                             data_types=['TEXT_MESSAGE'], contacts=['Joe Smith'])
+    expected_result = [record for record in records if record['data_type'] == 'TEXT_MESSAGE'
+                       and record['timestamp'].startswith('2023')
+                       and 'Joe Smith' in [record['originating_name']] + record['recipient_names']]
+    assert len(expected_result) == 5
+    _, result = google_voice_takeout_parser.process_directory(TEST_DATA_DIR, record_filter=record_filter)
+    assert result == expected_result
+
+
+def test_record_filter_skips_files(tmp_path, capsys) -> None:
+    # Files are named as in a Takeout export. Those ruled out by their names are never opened,
+    # so they don't need to be valid
+    shutil.copy(os.path.join(TEST_DATA_DIR, 'Call - Voicemail.html'),
+                tmp_path / '+11025550122 - Voicemail - 2022-10-24T22_26_52Z.html')
+    (tmp_path / '+11025550122 - Voicemail - 2021-01-01T00_00_00Z.html').write_text('Not HTML')
+    (tmp_path / '+11045550100 - Missed - 2022-10-24T22_26_52Z.html').write_text('Not HTML')
+    (tmp_path / '+11025550122 - Received - 2022-10-24T22_26_52Z.html').write_text('Not HTML')
+    shutil.copy(os.path.join(TEST_DATA_DIR, 'Text - Group text names.html'),
+                tmp_path / 'Group Conversation - 2020-01-01T00_00_00Z.html')
+
+    record_filter = google_voice_takeout_parser.RecordFilter(
+        since=datetime.datetime(2022, 1, 1, tzinfo=datetime.timezone.utc), data_types=['VOICEMAIL', 'TEXT_MESSAGE'],
+        contacts=['+11025550122'])
+    file_count, records = google_voice_takeout_parser.process_directory(str(tmp_path), record_filter=record_filter)
+    # The conversation's name can't rule it out, so its records are checked one by one
+    assert file_count == 2
+    assert sorted(record['filename'] for record in records) == [
+        '+11025550122 - Voicemail - 2022-10-24T22_26_52Z.html', 'Group Conversation - 2020-01-01T00_00_00Z.html']
+    assert capsys.readouterr().out == ''
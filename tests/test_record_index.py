@@ -0,0 +1,57 @@
+import datetime
+import os.path
+
+import google_voice_takeout_parser
+
+TEST_DATA_DIR = os.path.join("tests", "test_data")
+
+
+def _filenames(records):
+    return [record['filename'] for record in records]
+
+
+def test_record_index_lookups() -> None:
+    _, records = google_voice_takeout_parser.process_directory(TEST_DATA_DIR)
+    index = google_voice_takeout_parser.RecordIndex(records)
+    assert len(index) == len(records)
+
+    # Both as the sender and as a recipient, sorted by timestamp
+    result = index.query(phone_number='+11025550122')
+    assert [record['timestamp'] for record in result] == sorted(record['timestamp'] for record in result)
+    assert _filenames(result) == ['Call - Voicemail.html', 'Text - Outbound with name, yes response.html',
+                                  'Text - Outbound with name, yes response.html', 'Text - Outgoing conversation.html',
+                                  'Text - Outgoing conversation.html', 'Text - Group text names.html']
+    assert _filenames(index.query(phone_number='+11025550122', data_type='VOICEMAIL')) == ['Call - Voicemail.html']
+    assert index.query(phone_number='+19995550000') == []
+
+    assert _filenames(index.query(name='Joe Smith', start='2023-06-01 00:00:00 -0400',
+                                  end=datetime.datetime(2023, 12, 1, tzinfo=datetime.timezone.utc))) == [
+        'Text - Outbound with name, yes response.html', 'Text - Outbound with name, yes response.html',
+        'Call - Received with name.html', 'Call - Outgoing.html']
+
+    group_text = index.conversation('Text - Group text numbers.html')
+    assert group_text == [record for record in records if record['filename'] == 'Text - Group text numbers.html']
+    assert len(group_text) == 2
+    assert index.query(filename='Text - Group text numbers.html', phone_number='+11085550180') == group_text
+
+
+def test_record_index_time_range() -> None:
+    _, records = google_voice_takeout_parser.process_directory(TEST_DATA_DIR)
+    index = google_voice_takeout_parser.RecordIndex()
+    # Built incrementally, with a query in between
+    index.extend(records[:10])
+    assert len(index.query(start='2000-01-01 00:00:00 +0000')) == 10
+    index.extend(records[10:])
+
+    start = datetime.datetime(2022, 1, 1, tzinfo=datetime.timezone.utc)
+    end = datetime.datetime(2023, 1, 1, tzinfo=datetime.timezone.utc)
+    expected_result = sorted((record for record in records
+                              if start <= google_voice_takeout_parser.timestamp_to_datetime(record['timestamp']) < end),
+                             key=lambda record: google_voice_takeout_parser.timestamp_to_datetime(record['timestamp']))
+    assert index.query(start=start, end=end) == expected_result
+    assert len(index.query(start=int(start.timestamp()), end=int(end.timestamp()), data_type='TEXT_MESSAGE')) == 3
+    assert len(index.query()) == len(records)
+    for data_type in google_voice_takeout_parser.DataType:
+        expected_result = [record for record in index.query() if record['data_type'] == data_type.value]
+        assert index.query(data_type=data_type) == index.query(data_type=data_type.value) == expected_result
+        assert len(index.by_data_type[data_type.value]) == len(expected_result)
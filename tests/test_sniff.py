@@ -0,0 +1,65 @@
+import os
+import os.path
+import shutil
+import threading
+
+import pytest
+
+import google_voice_takeout_parser
+
+TEST_DATA_DIR = os.path.join("tests", "test_data")
+
+
+@pytest.mark.parametrize('test_file', sorted(f for f in os.listdir(TEST_DATA_DIR) if f.endswith('.html')))
+def test_sniff_file_matches_parse_file(test_file) -> None:
+    test_fpath = os.path.join(TEST_DATA_DIR, test_file)
+    sniffed = google_voice_takeout_parser.sniff_file(test_fpath)
+    records = google_voice_takeout_parser.parse_file(test_fpath)
+    assert sniffed.file_class in google_voice_takeout_parser.SUPPORTED_FILE_CLASSES
+    assert {record['data_type'] for record in records} == {sniffed.data_type}
+
+
+def test_sniff_bytes_incomplete() -> None:
+    with open(os.path.join(TEST_DATA_DIR, 'Call - Voicemail.html'), 'rb') as fh:
+        data = fh.read()
+    assert google_voice_takeout_parser.sniff_bytes(data[:200]) == (None, None)
+    assert google_voice_takeout_parser.sniff_bytes(b'<html><body><div class="unknown"></div></body></html>') == \
+        ('unknown', None)
+
+
+def test_process_directory_data_types(tmp_path, capsys) -> None:
+    file_count, records = google_voice_takeout_parser.process_directory(TEST_DATA_DIR,
+                                                                        data_types=['VOICEMAIL', 'MISSED CALL'])
+    assert file_count == 4
+    assert sorted(record['data_type'] for record in records) == ['MISSED CALL'] * 2 + ['VOICEMAIL'] * 2
+
+    # Files with an unsupported class are reported without being parsed
+    shutil.copy(os.path.join(TEST_DATA_DIR, 'Call - Voicemail.html'), tmp_path)
+    (tmp_path / 'Other.html').write_text('<html><body><div class="unknown"></div></body></html>')
+    profiler = google_voice_takeout_parser.ParseProfiler()
+    file_count, records = google_voice_takeout_parser.process_directory(str(tmp_path), profiler=profiler)
+    assert file_count == 2
+    assert len(records) == 1
+    assert [f[3] for f in profiler.files] == ['Call - Voicemail.html']
+    assert "Exception when processing file Other.html: Unknown file_class unknown" in capsys.readouterr().out
+
+
+def test_files_are_opened_once(monkeypatch) -> None:
+    opened = []
+
+    def counting_open(file, *args, **kwargs):
+        if os.fspath(file).endswith('.html'):
+            opened.append((os.path.basename(file), threading.current_thread() is threading.main_thread()))
+        return open(file, *args, **kwargs)
+
+    for module in (google_voice_takeout_parser.pipeline, google_voice_takeout_parser.sniffing,
+                   google_voice_takeout_parser.sources):
+        monkeypatch.setattr(module, 'open', counting_open, raising=False)
+    file_count, _ = google_voice_takeout_parser.process_directory(TEST_DATA_DIR)
+    assert len(opened) == len(set(opened)) == file_count
+
+    # With read ahead, the main thread doesn't open any of the files
+    opened.clear()
+    google_voice_takeout_parser.process_directory(TEST_DATA_DIR, read_ahead=8)
+    assert len(opened) == file_count
+    assert not any(main_thread for _, main_thread in opened)
@@ -0,0 +1,42 @@
+import os.path
+import sqlite3
+
+import google_voice_takeout_parser
+
+TEST_DATA_DIR = os.path.join("tests", "test_data")
+
+
+def test_write_to_sqlite(tmp_path) -> None:
+    db_fpath = str(tmp_path / 'takeout.sqlite')
+    _, csv_entries = google_voice_takeout_parser.process_directory(TEST_DATA_DIR)
+    records = google_voice_takeout_parser.iter_directory(TEST_DATA_DIR)
+    assert google_voice_takeout_parser.write_to_sqlite(db_fpath, records, batch_size=4) == len(csv_entries)
+
+    connection = sqlite3.connect(db_fpath)
+    assert connection.execute('SELECT COUNT(*) FROM records').fetchone()[0] == len(csv_entries)
+    # A contact's history is an index lookup on the recipients or originating number
+    rows = connection.execute('''SELECT DISTINCT records.filename FROM records
+                                 LEFT JOIN recipients ON recipients.record_id = records.id
+                                 WHERE recipients.phone_number = ? OR records.originating_phone_number = ?
+                                 ORDER BY records.filename''', ('+11025550163', '+11025550163')).fetchall()
+    assert rows == [('Call - Outgoing.html',)]
+    rows = connection.execute('''SELECT media_type, path FROM media_files
+                                 JOIN records ON media_files.record_id = records.id
+                                 WHERE records.filename = 'Call - Voicemail.html' ''').fetchall()
+    assert rows == [('audio', '+11025550122 - Voicemail - 2022-10-24T22_26_52Z.mp3')]
+    row = connection.execute('''SELECT timestamp, timestamp_utc, user_deleted FROM records
+                                WHERE filename = 'Call - Voicemail.html' ''').fetchone()
+    assert row == ('2022-10-24 18:26:52 -0400', '2022-10-24 22:26:52', 0)
+    plan = connection.execute('''EXPLAIN QUERY PLAN SELECT * FROM records WHERE data_type = 'VOICEMAIL' ''').fetchall()
+    assert 'records_data_type' in str(plan)
+    connection.close()
+
+
+def test_write_to_sqlite_replaces_tables(tmp_path) -> None:
+    db_fpath = str(tmp_path / 'takeout.sqlite')
+    _, csv_entries = google_voice_takeout_parser.process_directory(TEST_DATA_DIR)
+    google_voice_takeout_parser.write_to_sqlite(db_fpath, csv_entries)
+    google_voice_takeout_parser.write_to_sqlite(db_fpath, csv_entries)
+    connection = sqlite3.connect(db_fpath)
+    assert connection.execute('SELECT COUNT(*) FROM records').fetchone()[0] == len(csv_entries)
+    connection.close()
@@ -0,0 +1,43 @@
+import os
+import os.path
+import shutil
+
+import pytest
+
+import google_voice_takeout_parser
+
+TEST_DATA_DIR = os.path.join("tests", "test_data")
+
+
+@pytest.mark.parametrize('test_file', sorted(f for f in os.listdir(TEST_DATA_DIR) if f.startswith('Text')))
+def test_iter_text_file_parity(test_file) -> None:
+    test_fpath = os.path.join(TEST_DATA_DIR, test_file)
+    expected_result = google_voice_takeout_parser.parse_file(test_fpath)
+    # A small chunk size splits tags and messages across chunks
+    assert list(google_voice_takeout_parser.iter_text_file(test_fpath, chunk_size=64)) == expected_result
+
+
+def test_iter_text_file_rejects_calls() -> None:
+    test_fpath = os.path.join(TEST_DATA_DIR, 'Call - Voicemail.html')
+    with pytest.raises(Exception, match="is not a conversation file"):
+        list(google_voice_takeout_parser.iter_text_file(test_fpath))
+
+
+def test_process_directory_stream_threshold(tmp_path) -> None:
+    indir = tmp_path / 'takeout'
+    shutil.copytree(TEST_DATA_DIR, indir)
+    expected_result = google_voice_takeout_parser.process_directory(str(indir))
+    assert google_voice_takeout_parser.process_directory(str(indir), stream_threshold=0) == expected_result
+    assert google_voice_takeout_parser.process_directory(str(indir), workers=2, stream_threshold=0) == expected_result
+
+
+@pytest.mark.parametrize('old,new', [('</q>', ''), ('<q>', '<q><b>')])
+def test_stream_threshold_falls_back_on_malformed_markup(tmp_path, capsys, old, new) -> None:
+    # Unclosed tags, which html5lib repairs but the streaming tokenizer can't
+    indir = tmp_path / 'takeout'
+    shutil.copytree(TEST_DATA_DIR, indir)
+    test_fpath = indir / 'Text - Group text names.html'
+    test_fpath.write_text(test_fpath.read_text(encoding='utf-8').replace(old, new), encoding='utf-8')
+    expected_result = google_voice_takeout_parser.process_directory(str(indir))
+    assert google_voice_takeout_parser.process_directory(str(indir), stream_threshold=0) == expected_result
+    assert "Exception when processing file" not in capsys.readouterr().out
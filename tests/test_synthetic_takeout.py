@@ -0,0 +1,27 @@
+import importlib.util
+import os.path
+
+import google_voice_takeout_parser
+
+SYNTHETIC_TAKEOUT_FPATH = os.path.join("benchmarks", "synthetic_takeout.py")
+
+
+def load_synthetic_takeout():
+    spec = importlib.util.spec_from_file_location('synthetic_takeout', SYNTHETIC_TAKEOUT_FPATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_generated_takeout_parses(tmp_path, capsys) -> None:
+    synthetic_takeout = load_synthetic_takeout()
+    file_count, record_count = synthetic_takeout.generate_takeout(
+        str(tmp_path), calls=20, voicemails=5, conversations=10, group_conversations=2, messages_per_group=50,
+        media_rate=0.5)
+    parsed_file_count, csv_entries = google_voice_takeout_parser.process_directory(str(tmp_path))
+    assert "Exception" not in capsys.readouterr().out
+    assert parsed_file_count == file_count
+    assert len(csv_entries) == record_count
+    assert any(entry['media_files'] for entry in csv_entries)
+    assert {entry['data_type'] for entry in csv_entries} == {'INCOMING CALL', 'OUTGOING CALL', 'MISSED CALL',
+                                                             'VOICEMAIL', 'TEXT_MESSAGE'}
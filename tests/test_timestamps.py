@@ -0,0 +1,85 @@
+import datetime
+import os.path
+
+import pytest
+
+import google_voice_takeout_parser
+
+TEST_DATA_DIR = os.path.join("tests", "test_data")
+
+
+def _strptime_timestamp(timestamp_text):
+    # The original implementation of parse_timestamp
+    return datetime.datetime.strptime("".join(timestamp_text.rsplit(':', 1)), '%Y-%m-%dT%H:%M:%S.%f%z')
+
+
+@pytest.mark.parametrize('timestamp_text', ['2022-09-30T14:36:36.127-04:00', '2023-01-19T17:45:15.000+05:30',
+                                            '2024-02-29T00:00:00.999+00:00', '2022-09-30T14:36:36.127000-04:00'])
+def test_parse_timestamp(timestamp_text) -> None:
+    expected_timestamp = _strptime_timestamp(timestamp_text)
+    assert google_voice_takeout_parser.parse_timestamp(timestamp_text) == expected_timestamp
+    assert google_voice_takeout_parser.format_timestamp(timestamp_text) == \
+        expected_timestamp.strftime(google_voice_takeout_parser.RECORD_TIMESTAMP_FORMAT)
+
+
+def test_parse_timestamp_shares_timezones() -> None:
+    first = google_voice_takeout_parser.parse_timestamp('2022-09-30T14:36:36.127-04:00')
+    second = google_voice_takeout_parser.parse_timestamp('2023-06-30T16:48:03.000-04:00')
+    assert first.tzinfo is second.tzinfo
+
+
+@pytest.mark.parametrize('timestamp_text', ['2022-13-30T14:36:36.127-04:00', '2022-09-30T14:36:36.127',
+                                            'not a timestamp'])
+def test_parse_timestamp_invalid(timestamp_text) -> None:
+    with pytest.raises(ValueError):
+        google_voice_takeout_parser.parse_timestamp(timestamp_text)
+
+
+def test_convert_timestamp() -> None:
+    timestamp = '2022-10-24 18:26:52 -0400'
+    expected_datetime = datetime.datetime(2022, 10, 24, 18, 26, 52,
+                                          tzinfo=datetime.timezone(datetime.timedelta(hours=-4)))
+    assert google_voice_takeout_parser.convert_timestamp(timestamp, 'str') == timestamp
+    assert google_voice_takeout_parser.convert_timestamp(timestamp, 'datetime') == expected_datetime
+    assert google_voice_takeout_parser.convert_timestamp(timestamp, 'epoch') == 1666650412
+    assert google_voice_takeout_parser.convert_timestamp(expected_datetime, 'str') == timestamp
+    assert google_voice_takeout_parser.convert_timestamp(1666650412, 'datetime') == expected_datetime
+    with pytest.raises(Exception, match="Unknown timestamp type"):
+        google_voice_takeout_parser.convert_timestamp(timestamp, 'date')
+
+
+@pytest.mark.parametrize('timestamp_type', ['datetime', 'epoch'])
+def test_process_directory_timestamp_type(timestamp_type) -> None:
+    _, expected_result = google_voice_takeout_parser.process_directory(TEST_DATA_DIR)
+    _, result = google_voice_takeout_parser.process_directory(TEST_DATA_DIR, timestamp_type=timestamp_type)
+    assert len(result) == len(expected_result)
+    for record, expected_record in zip(result, expected_result):
+        timestamp = record['timestamp']
+        if timestamp_type == 'datetime':
+            # The records' strings have no milliseconds
+            timestamp = timestamp.replace(microsecond=0)
+        assert timestamp == google_voice_takeout_parser.convert_timestamp(expected_record['timestamp'],
+                                                                          timestamp_type)
+
+
+def test_datetime_keeps_milliseconds() -> None:
+    [record] = google_voice_takeout_parser.parse_file(os.path.join(TEST_DATA_DIR, 'Call - Voicemail.html'),
+                                                      timestamp_type='datetime')
+    assert record.timestamp == datetime.datetime(2022, 10, 24, 18, 26, 52, 822000,
+                                                 tzinfo=datetime.timezone(datetime.timedelta(hours=-4)))
+
+
+@pytest.mark.parametrize('timestamp_type', ['str', 'datetime', 'epoch'])
+def test_cached_timestamp_types(tmp_path, timestamp_type) -> None:
+    _, expected_result = google_voice_takeout_parser.process_directory(TEST_DATA_DIR, timestamp_type=timestamp_type)
+    with google_voice_takeout_parser.ParseCache(str(tmp_path / 'cache.db')) as cache:
+        # The cache is filled by a run with another type
+        other_type = 'epoch' if timestamp_type != 'epoch' else 'str'
+        google_voice_takeout_parser.process_directory(TEST_DATA_DIR, cache=cache, timestamp_type=other_type)
+        _, result = google_voice_takeout_parser.process_directory(TEST_DATA_DIR, cache=cache,
+                                                                  timestamp_type=timestamp_type)
+    if timestamp_type == 'datetime':
+        # Files cached with string timestamps have lost their milliseconds
+        expected_result = [record.timestamp.replace(microsecond=0) for record in expected_result]
+        result = [record.timestamp.replace(microsecond=0) for record in result]
+    assert result == expected_result